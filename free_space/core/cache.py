@@ -0,0 +1,223 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+GENERATION_KEY = 'two-tier:generation:{namespace}'
+CLEAR_KEY = 'two-tier:generation'
+MISSING = object()
+
+
+def namespace(key):
+    """Пространство ключа — всё до последнего ':' ('page', 'posts')."""
+    return key.rpartition(':')[0]
+
+
+class TwoTierCache(BaseCache):
+    """Маленький LRU в памяти процесса (L1) перед общим кешем (L2).
+
+    Запись идёт в оба уровня, чтение — сначала из L1. Точечно сбросить
+    ключ в чужих процессах нельзя, поэтому delete и incr/decr сдвигают
+    поколение пространства ключа (см. namespace), а clear — общее.
+    Каждый воркер не реже раза в GENERATION_POLL секунд сверяет
+    поколения пространств, которые держит в L1, одним get_many и
+    выбрасывает записи только сдвинутых. Записи L1 живут не дольше
+    L1_TIMEOUT, это предел рассинхронизации для ключей, перезаписанных
+    через set().
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_size = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._local_timeout = float(options.get('L1_TIMEOUT', 5))
+        self._poll = float(options.get('GENERATION_POLL', 1))
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._cleared = MISSING
+        self._generations = {}
+        self._checked_at = 0
+        self._stats = dict.fromkeys(
+            ('local_hits', 'shared_hits', 'misses', 'evictions',
+             'invalidations'), 0
+        )
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def stats(self):
+        """Счётчики процесса: попадания по уровням, промахи, вытеснения."""
+        with self._lock:
+            return {
+                **self._stats,
+                'local_size': len(self._local),
+                'namespaces': len(self._generations),
+            }
+
+    def _sync_generations(self):
+        now = time.monotonic()
+        if now - self._checked_at < self._poll:
+            return
+        with self._lock:
+            namespaces = list(self._generations)
+        current = self.shared.get_many([CLEAR_KEY] + [
+            GENERATION_KEY.format(namespace=name) for name in namespaces
+        ])
+        with self._lock:
+            self._checked_at = now
+            if current.get(CLEAR_KEY) != self._cleared:
+                if self._local:
+                    self._stats['invalidations'] += 1
+                self._local.clear()
+                self._cleared = current.get(CLEAR_KEY)
+            stale = {
+                name for name in namespaces
+                if self._generations.get(name) != current.get(
+                    GENERATION_KEY.format(namespace=name)
+                )
+            }
+            for name in stale:
+                self._generations[name] = current.get(
+                    GENERATION_KEY.format(namespace=name)
+                )
+            if stale and self._drop(stale):
+                self._stats['invalidations'] += 1
+
+    def _watch(self, name):
+        """Запоминает поколение пространства до чтения его значений."""
+        if name in self._generations:
+            return
+        generation = self.shared.get(GENERATION_KEY.format(namespace=name))
+        with self._lock:
+            self._generations.setdefault(name, generation)
+
+    def _drop(self, namespaces):
+        """Выбрасывает из L1 записи пространств; вызывается под _lock."""
+        keys = [
+            key for key, (_, _, name) in self._local.items()
+            if name in namespaces
+        ]
+        for key in keys:
+            del self._local[key]
+        return bool(keys)
+
+    def _bump_generation(self, keys):
+        for name in {namespace(key) for key in keys}:
+            generation_key = GENERATION_KEY.format(namespace=name)
+            try:
+                generation = self.shared.incr(generation_key)
+            except ValueError:
+                # Ключа ещё нет или он вытеснен — новое начало не
+                # совпадёт с поколением, которое помнят воркеры.
+                generation = time.time_ns()
+                if not self.shared.add(generation_key, generation, None):
+                    generation = self.shared.incr(generation_key)
+            with self._lock:
+                self._drop({name})
+                self._generations[name] = generation
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return MISSING
+            expires, value, _ = entry
+            if expires <= time.monotonic():
+                del self._local[key]
+                return MISSING
+            self._local.move_to_end(key)
+            self._stats['local_hits'] += 1
+        return pickle.loads(value)
+
+    def _local_set(self, key, value, timeout, name):
+        lifetime = self._local_timeout
+        if timeout is not None:
+            if timeout <= 0:
+                self._local_delete(key)
+                return
+            lifetime = min(lifetime, timeout)
+        entry = (time.monotonic() + lifetime, pickle.dumps(value), name)
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > self._local_size:
+                self._local.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, key, default=None, version=None):
+        self._sync_generations()
+        local_key = self.make_key(key, version)
+        value = self._local_get(local_key)
+        if value is not MISSING:
+            return value
+        self._watch(namespace(key))
+        value = self.shared.get(key, MISSING, version=version)
+        if value is MISSING:
+            with self._lock:
+                self._stats['misses'] += 1
+            return default
+        with self._lock:
+            self._stats['shared_hits'] += 1
+        self._local_set(local_key, value, None, namespace(key))
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self._watch(namespace(key))
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(
+            self.make_key(key, version), value, timeout, namespace(key)
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self._watch(namespace(key))
+        if not self.shared.add(key, value, timeout, version=version):
+            return False
+        self._local_set(
+            self.make_key(key, version), value, timeout, namespace(key)
+        )
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self._bump_generation([key])
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(keys, version=version)
+        self._bump_generation(keys)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._bump_generation([key])
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self.shared.clear()
+        cleared = time.time_ns()
+        self.shared.set(CLEAR_KEY, cleared, None)
+        with self._lock:
+            self._local.clear()
+            self._generations.clear()
+            self._cleared = cleared
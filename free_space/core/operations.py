@@ -0,0 +1,46 @@
+from django.db import NotSupportedError
+from django.db.migrations import AddIndex
+
+
+class AddIndexConcurrently(AddIndex):
+    """AddIndex, который в Postgres строит индекс CONCURRENTLY.
+
+    Такая сборка не держит блокировку записи на таблицу, зато не
+    работает в транзакции: миграции с этой операцией нужен
+    atomic = False. В других базах это обычный AddIndex.
+    """
+
+    def _concurrent(self, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return False
+        if schema_editor.atomic_migration:
+            raise NotSupportedError(
+                'AddIndexConcurrently нельзя выполнять в транзакции: '
+                'укажите в миграции atomic = False.'
+            )
+        return True
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if not self._concurrent(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.execute(str(
+                self.index.create_sql(model, schema_editor)
+            ).replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1))
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if not self._concurrent(schema_editor):
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.execute(
+                'DROP INDEX CONCURRENTLY IF EXISTS '
+                f'{schema_editor.quote_name(self.index.name)}'
+            )
@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import TwoTierCache
+
+SHARED_DIR = tempfile.mkdtemp()
+
+
+def worker(**options):
+    """Отдельный экземпляр бэкенда — как кеш другого воркера."""
+    return TwoTierCache('', {'OPTIONS': {
+        'SHARED': 'shared', 'GENERATION_POLL': 0, **options
+    }})
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_DIR,
+    },
+})
+class TwoTierCacheTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(SHARED_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.first = worker()
+        self.second = worker()
+        self.first.clear()
+
+    def test_value_shared_between_workers(self):
+        '''Запись одного воркера видна другому, повторное чтение — из L1.'''
+        self.first.set('key', {'value': 1})
+        self.assertEqual(self.second.get('key'), {'value': 1})
+        self.assertEqual(self.second.get('key'), {'value': 1})
+        self.assertEqual(self.second.get('missing', 'default'), 'default')
+        stats = self.second.stats()
+        self.assertEqual(stats['shared_hits'], 1)
+        self.assertEqual(stats['local_hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_delete_reaches_other_workers(self):
+        '''Удаление сдвигает поколение и сбрасывает L1 других воркеров.'''
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+
+    def test_incr_reaches_other_workers(self):
+        '''Счётчик, увеличенный одним воркером, другие видят сразу.'''
+        self.first.set('version', 1)
+        self.assertEqual(self.second.get('version'), 1)
+        self.assertEqual(self.first.incr('version'), 2)
+        self.assertEqual(self.second.get('version'), 2)
+
+    def test_writes_drop_only_their_namespace(self):
+        '''delete и incr сбрасывают в L1 только своё пространство ключей.'''
+        self.first.set('page:home', 'html')
+        self.first.set('posts:version', 1)
+        self.first.set('page-lock:home', 1)
+        for key in ('page:home', 'posts:version', 'page-lock:home'):
+            self.second.get(key)
+        self.first.incr('posts:version')
+        self.first.delete('page-lock:home')
+        self.assertEqual(self.second.get('posts:version'), 2)
+        self.assertIsNone(self.second.get('page-lock:home'))
+        hits = self.second.stats()['local_hits']
+        self.assertEqual(self.second.get('page:home'), 'html')
+        self.assertEqual(self.second.stats()['local_hits'], hits + 1)
+
+    def test_clear_reaches_other_workers(self):
+        '''Очистка общего кеша сбрасывает L1 всех воркеров.'''
+        self.first.set('key', 'value')
+        self.second.get('key')
+        self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+
+    def test_local_tier_is_bounded(self):
+        '''L1 хранит не больше L1_MAX_ENTRIES ключей, старые вытесняются.'''
+        small = worker(L1_MAX_ENTRIES=2)
+        for key in 'abc':
+            small.set(key, key)
+        stats = small.stats()
+        self.assertEqual(stats['local_size'], 2)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(small.get('a'), 'a')
+        self.assertEqual(small.stats()['shared_hits'], 1)
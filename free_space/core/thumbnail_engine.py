@@ -0,0 +1,9 @@
+from PIL import Image
+from sorl.thumbnail.engines.pil_engine import Engine as PilEngine
+
+
+class Engine(PilEngine):
+    """PIL-движок sorl без Image.ANTIALIAS, которого нет с Pillow 10."""
+
+    def _scale(self, image, width, height):
+        return image.resize((width, height), resample=Image.LANCZOS)
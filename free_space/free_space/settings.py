@@ -15,8 +15,21 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS').split(' ')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            'GENERATION_POLL': 1,
+        },
+    },
+    'shared': {
+        'BACKEND': os.getenv(
+            'SHARED_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('SHARED_CACHE_LOCATION', ''),
+    },
 }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -43,6 +56,28 @@ INTERNAL_IPS = [
 ]
 
 IMAGE_PLACEMENT = 'posts/'
+# Загрузки пересжимаются: наибольшая сторона, формат (WEBP, а если
+# Pillow собран без него — JPEG) и качество.
+IMAGE_MAX_SIZE = 2048
+IMAGE_FORMAT = 'WEBP'
+IMAGE_QUALITY = 82
+# Картинка карточки поста: пропорции кадра и ширины вариантов для srcset.
+CARD_IMAGE_SIZE = (960, 339)
+CARD_IMAGE_WIDTHS = (320, 640, 960, 1920)
+# Размеры миниатюр, которые используют шаблоны: имя -> (геометрия, опции).
+# Все они создаются после загрузки картинки, рендер их не генерирует.
+THUMBNAIL_SPECS = {
+    f'card_{width}': (
+        f'{width}x{width * CARD_IMAGE_SIZE[1] // CARD_IMAGE_SIZE[0]}',
+        {'crop': 'center', 'upscale': True},
+    )
+    for width in CARD_IMAGE_WIDTHS
+}
+THUMBNAIL_ENGINE = 'core.thumbnail_engine.Engine'
+# Процессов для генерации миниатюр; 0 — генерировать сразу после
+# сохранения поста в том же процессе. Пулу нужен общий кеш shared
+# (SHARED_CACHE_BACKEND): LocMem у каждого процесса свой.
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 0))
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
@@ -57,12 +92,58 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
+    'posts.middleware.AnonymousPageCacheMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
 NUMB_POSTS_PAGE = 10
 
+NUMB_COMMENTS_PAGE = 20
+
+# Сколько номеров страниц показывать по обе стороны от текущей.
+PAGINATOR_ON_EACH_SIDE = 2
+
+# Выше этого числа строк пагинаторы и админка берут оценку
+# планировщика Postgres вместо COUNT(*).
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Сколько постов можно спросить у like_states за один запрос.
+NUMB_LIKE_STATES = 100
+
+# Карточки постов живут долго: их ключ меняется с правкой поста.
+FEED_CACHE_TTL = 60 * 60
+
+# Кеш целых страниц для гостей: TTL по имени view (секунды), сколько
+# ещё отдавать устаревшую копию, пока одна копия перестраивается,
+# сколько держать блокировку перестройки и сколько ждать первую
+# копию страницы, которую строит другой запрос.
+PAGE_CACHE_TTLS = {
+    'posts:index': 30,
+    'posts:group_list': 60,
+    'posts:profile': 60,
+    'posts:post_detail': 60,
+}
+PAGE_CACHE_STALE = 60 * 10
+PAGE_CACHE_LOCK_TIMEOUT = 30
+PAGE_CACHE_WAIT = 5
+
+# Лента подписок: длина материализованной ленты читателя и число
+# подписчиков, сверх которого посты автора подмешиваются при чтении.
+TIMELINE_LENGTH = 800
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Счётчики лайков: с какого значения пост считается горячим
+# и на сколько строк-шардов делится его счётчик.
+LIKE_COUNTER_HOT = 1000
+LIKE_COUNTER_SHARDS = 16
+
+# Поиск: конфигурация текстового поиска Postgres и сколько слов
+# запроса учитывать (остальные отбрасываются).
+SEARCH_CONFIG = 'russian'
+SEARCH_MAX_TERMS = 8
+
 ROOT_URLCONF = 'free_space.urls'
 
 # Путь к директории с шаблонами вынесен в переменную:
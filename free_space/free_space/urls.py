@@ -3,10 +3,13 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import cache_stats
+
 handler403 = 'core.views.csrf_failure'
 handler404 = 'core.views.page_not_found'
 urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
+    path('admin/cache-stats/', cache_stats, name='cache_stats'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
@@ -1,9 +1,185 @@
 from django.contrib import admin
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.admin.models import DELETION, LogEntry
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.template.response import TemplateResponse
 
-from .models import Comment, Follow, Like, Group, Post
+from .models import Comment, Follow, Like, Group, Post, User
+from .paginators import EstimatedCountPaginator, estimated_count
 
+DELETE_BATCH_SIZE = 500
 
-class PostAdmin(admin.ModelAdmin):
+
+class EstimatedCountChangeList(ChangeList):
+    """Итоги списка по estimated_count, без COUNT(*) огромных таблиц."""
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.show_full_result_count = True
+        self.full_result_count = estimated_count(self.root_queryset)
+        self.show_admin_actions = bool(self.full_result_count)
+
+
+class EstimatedCountAdmin(admin.ModelAdmin):
+    # Полный итог считает EstimatedCountChangeList, а не ChangeList.
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return EstimatedCountChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return EstimatedCountPaginator(
+            queryset, per_page, orphans, allow_empty_first_page
+        )
+
+
+class PrefixListFilter(admin.FieldListFilter):
+    """Фильтр по началу строки: LIKE 'начало%' идёт по индексу поля.
+
+    В search_fields такой поиск не помогает: Django объединяет поля
+    через OR, и соседнее поле «%текст%» всё равно просмотрит таблицу.
+    """
+    template = 'admin/prefix_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = f'{field_path}__startswith'
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.title = f'началу: {self.title}'
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            'parameter': self.lookup_kwarg,
+            'value': self.used_parameters.get(self.lookup_kwarg, ''),
+            'params': [
+                (name, value) for name, value in changelist.params.items()
+                if name != self.lookup_kwarg
+            ],
+            'query_string': changelist.get_query_string(
+                remove=[self.lookup_kwarg]
+            ),
+        }
+
+
+class RowAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое не ищет выбранный объект запросом.
+
+    В list_editable объект строки уже пришёл через list_select_related,
+    его и показываем вместо SELECT на каждую строку списка.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        if self.selected is None or str(self.selected.pk) not in value:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, self.selected.pk,
+            self.choices.field.label_from_instance(self.selected),
+            True, len(options),
+        ))
+        return [(None, options, 0)]
+
+
+class LargeTableAdmin(EstimatedCountAdmin):
+    """Список большой таблицы: оценка итогов и удаление пачками.
+
+    Стандартное delete_selected перед подтверждением собирает все
+    выбранные объекты со связанными, поэтому его заменяет
+    delete_in_batches: подтверждение показывает только их число.
+    """
+    actions = ('delete_in_batches',)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = RowAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        base = super().get_changelist_form(request, **kwargs)
+
+        class RowForm(base):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                for name, field in self.fields.items():
+                    widget = getattr(field.widget, 'widget', field.widget)
+                    if isinstance(widget, RowAutocompleteSelect):
+                        widget.selected = getattr(self.instance, name)
+
+        return RowForm
+
+    def delete_in_batches(self, request, queryset):
+        if not request.POST.get('post'):
+            return TemplateResponse(
+                request, 'admin/delete_in_batches_confirmation.html', {
+                    **self.admin_site.each_context(request),
+                    'title': self.delete_in_batches.short_description,
+                    'opts': self.model._meta,
+                    'media': self.media,
+                    'count': estimated_count(queryset),
+                    'action_checkbox_name': ACTION_CHECKBOX_NAME,
+                    'selected': request.POST.getlist(ACTION_CHECKBOX_NAME),
+                    'select_across': request.POST.get('select_across'),
+                }
+            )
+        ids = queryset.order_by('pk').values_list('pk', flat=True)
+        batch = list(ids[:DELETE_BATCH_SIZE])
+        deleted = 0
+        while batch:
+            # Сигналы удаления срабатывают как обычно, но в памяти
+            # и в транзакции не больше одной пачки.
+            with transaction.atomic():
+                self.log_batch_deletion(request, batch)
+                deleted += self.model.objects.filter(
+                    pk__in=batch
+                ).delete()[1].get(self.model._meta.label, 0)
+            batch = list(ids.filter(pk__gt=batch[-1])[:DELETE_BATCH_SIZE])
+        self.message_user(request, f'Удалено объектов: {deleted}')
+
+    def log_batch_deletion(self, request, batch):
+        """Записи журнала, как у log_deletion, одним INSERT на пачку."""
+        objects = self.model.objects.filter(pk__in=batch)
+        if isinstance(self.list_select_related, (list, tuple)):
+            objects = objects.select_related(*self.list_select_related)
+        content_type = ContentType.objects.get_for_model(
+            self.model, for_concrete_model=False
+        )
+        LogEntry.objects.bulk_create(
+            LogEntry(
+                user_id=request.user.pk,
+                content_type_id=content_type.pk,
+                object_id=str(obj.pk),
+                object_repr=str(obj)[:200],
+                action_flag=DELETION,
+            )
+            for obj in objects
+        )
+
+    delete_in_batches.allowed_permissions = ('delete',)
+    delete_in_batches.short_description = 'Удалить выбранные пачками'
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk',
                     'text',
                     'pub_date',
@@ -11,39 +187,74 @@ class PostAdmin(admin.ModelAdmin):
                     'group',
                     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
+    # Поиск по тексту — «%текст%» по всей таблице; автора ищет
+    # отдельный фильтр по началу логина.
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', ('author__username', PrefixListFilter))
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
 
 
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('title', 'slug')
+    search_fields = ('^title', '^slug')
+
+
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('pk',
                     'post',
                     'author',
                     'created',
                     )
     list_filter = ('created',)
+    list_select_related = ('post__author', 'post__group', 'author')
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
+    search_fields = ('^author__username',)
+    date_hierarchy = 'created'
 
 
 admin.site.register(Comment, CommentAdmin)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('user',
                     'author',
                     )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('^user__username', '^author__username')
 
 
 admin.site.register(Follow, FollowAdmin)
 
 
-class LikeAdmin(admin.ModelAdmin):
-    autocomplete_fields = ('liked_by', 'blog_post')
+class LikeAdmin(LargeTableAdmin):
+    raw_id_fields = ('blog_post',)
+    autocomplete_fields = ('liked_by',)
     list_display = ('blog_post', 'liked_by', 'like', 'created')
+    list_select_related = (
+        'blog_post__author', 'blog_post__group', 'liked_by'
+    )
+    search_fields = ('^liked_by__username',)
+    date_hierarchy = 'created'
+    ordering = ('-created', '-id')
+
+
+admin.site.register(Like, LikeAdmin)
+
+
+class PrefixSearchUserAdmin(UserAdmin):
+    # Поиск авторов в автодополнении — по началу логина или почты:
+    # такой LIKE идёт по индексу, «%текст%» просматривал бы таблицу.
+    search_fields = ('^username', '^email')
 
 
-admin.site.register(Like, LikeAdmin)
\ No newline at end of file
+admin.site.unregister(User)
+admin.site.register(User, PrefixSearchUserAdmin)
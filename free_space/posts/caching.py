@@ -0,0 +1,90 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+VERSION_KEY = 'posts:version:{scope}'
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def versions(scopes):
+    """Версии областей контента: 'site', 'index', 'group:<slug>',
+    'author:<username>', 'post:<id>'.
+
+    Версия — время последней правки области в миллисекундах, по ней же
+    считается Last-Modified. Пропавший ключ начинается с текущего
+    времени и не совпадёт ни с одной из уже выданных версий.
+    """
+    keys = [VERSION_KEY.format(scope=scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, now_ms(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    now = now_ms()
+    for scope in set(scopes):
+        key = VERSION_KEY.format(scope=scope)
+        current = cache.get(key)
+        try:
+            # incr, а не set: сдвиг сразу видят L1 всех воркеров.
+            cache.incr(key, max(1, now - current))
+        except (TypeError, ValueError):
+            cache.add(key, now, None)
+
+
+def post_scopes(post):
+    """Области, в которых виден пост: лента, автор, группа и он сам."""
+    scopes = ['index', f'post:{post.id}', f'author:{post.author.username}']
+    if post.group_id:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes
+
+
+def conditional_page(scopes):
+    """Отвечает 304 до выборки постов и рендера шаблона.
+
+    scopes(request, *args, **kwargs) называет области страницы; к ним
+    всегда добавляется 'site'. Лайк или комментарий сдвигают только
+    версию своего поста, а не валидаторы всех страниц. Пользователь и
+    CSRF-cookie в ETag отвечают за личные части страницы.
+    """
+    def page_versions(request, *args, **kwargs):
+        if not hasattr(request, 'page_versions'):
+            request.page_versions = versions(
+                ['site', *scopes(request, *args, **kwargs)]
+            )
+        return request.page_versions
+
+    def page_etag(request, *args, **kwargs):
+        return hashlib.md5(':'.join(map(str, (
+            request.path,
+            request.GET.urlencode(),
+            request.user.pk,
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            *page_versions(request, *args, **kwargs),
+        ))).encode()).hexdigest()
+
+    def page_last_modified(request, *args, **kwargs):
+        return datetime.fromtimestamp(
+            max(page_versions(request, *args, **kwargs)) / 1000,
+            timezone.utc,
+        )
+
+    def decorator(view):
+        view = condition(
+            etag_func=page_etag, last_modified_func=page_last_modified
+        )(view)
+        # Кеш страниц гостей сверяет записи с теми же версиями.
+        view.page_versions = page_versions
+        return view
+    return decorator
@@ -0,0 +1,186 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from . import thumbnails
+from .models import MediaFile, Post
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def walk(storage, directory):
+    """Имена файлов папки хранилища по одному, без списка всего дерева."""
+    folders = [storage.path(directory)]
+    while folders:
+        try:
+            entries = os.scandir(folders.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, storage.location)
+                    yield name.replace(os.sep, '/'), entry.stat().st_mtime
+
+
+class Collector:
+    """Ищет и удаляет файлы картинок, на которые ничто не ссылается.
+
+    Три прохода: миниатюры исходников, на которые больше нет ссылок (в том
+    числе посчитанные со старым хранилищем), затем оригиналы без ссылок
+    в MediaFile и у постов, затем файлы миниатюр, забытые хранилищем ключей
+    sorl. Файлы моложе min_age не трогаются: загрузка пишет файл до
+    коммита поста, а воркер — миниатюру до записи её ключа. Удаления
+    идут не чаще rate в секунду, чтобы не нагружать диск.
+    """
+
+    def __init__(self, batch_size=500, min_age=3600, rate=0, dry_run=False):
+        self.batch_size = batch_size
+        self.min_age = min_age
+        self.rate = rate
+        self.dry_run = dry_run
+        self.storage = Post._meta.get_field('image').storage
+        self._next_at = 0
+
+    def collect(self):
+        """(вид, имя) каждого удалённого, а при dry_run — лишнего файла."""
+        yield from self.stale_sources()
+        yield from self.orphan_originals()
+        yield from self.orphan_thumbnails()
+
+    def throttle(self, count=1):
+        """Ждёт перед удалением count файлов одной пачкой."""
+        if not self.rate:
+            return
+        now = time.monotonic()
+        if self._next_at > now:
+            time.sleep(self._next_at - now)
+        self._next_at = max(now, self._next_at) + count / self.rate
+
+    def referenced(self, names):
+        # Счётчики MediaFile ведёт только загрузка в Post.save; картинки,
+        # записанные мимо неё (loaddata, update(image=...)), находит
+        # индекс post_image.
+        alive = set(MediaFile.objects.filter(
+            name__in=names, refs__gt=0
+        ).values_list('name', flat=True))
+        rest = [name for name in names if name not in alive]
+        if rest:
+            alive.update(Post.objects.filter(
+                image__in=rest
+            ).values_list('image', flat=True))
+        return alive
+
+    def old_files(self, storage, directory):
+        deadline = time.time() - self.min_age
+        for name, modified in walk(storage, directory):
+            if modified < deadline:
+                yield name
+
+    def images(self, keys):
+        """Картинки из хранилища ключей sorl: {ключ: ImageFile}."""
+        prefix = add_prefix('')
+        return {
+            key[len(prefix):]: deserialize_image_file(value)
+            for key, value in KVStore.objects.filter(
+                key__in=[add_prefix(key) for key in keys]
+            ).values_list('key', 'value')
+        }
+
+    def stale_sources(self):
+        prefix = add_prefix('', 'thumbnails')
+        last_key = ''
+        while True:
+            rows = list(KVStore.objects.filter(
+                key__startswith=prefix, key__gt=last_key
+            ).order_by('key').values_list('key', 'value')[:self.batch_size])
+            if not rows:
+                return
+            last_key = rows[-1][0]
+            thumbnail_keys = {
+                key[len(prefix):]: json.loads(value) for key, value in rows
+            }
+            sources = self.images(thumbnail_keys)
+            alive = self.referenced(
+                [source.name for source in sources.values()]
+            )
+            stale = {
+                key: source for key, source in sources.items()
+                if source.name.startswith(settings.IMAGE_PLACEMENT) and (
+                    source.name not in alive
+                    or source.key != thumbnails.source(source.name).key
+                )
+            }
+            files = self.images(
+                thumbnail_key for key in stale
+                for thumbnail_key in thumbnail_keys[key]
+            )
+            for key, source in stale.items():
+                names = [
+                    files[thumbnail_key].name
+                    for thumbnail_key in thumbnail_keys[key]
+                    if thumbnail_key in files
+                ]
+                if not self.dry_run:
+                    self.throttle(len(names))
+                    delete_thumbnails(source, delete_file=False)
+                for name in names:
+                    yield 'thumbnail', name
+
+    def orphan_originals(self):
+        for names in batches(
+            self.old_files(self.storage, settings.IMAGE_PLACEMENT),
+            self.batch_size,
+        ):
+            alive = self.referenced(names)
+            for name in names:
+                if name in alive:
+                    continue
+                if not self.dry_run:
+                    self.throttle()
+                    # Под блокировкой строки счётчика: загрузка той же
+                    # картинки в это время либо подождёт, либо отменит
+                    # удаление.
+                    MediaFile.objects.get_or_create(name=name)
+                    if not MediaFile.objects.remove_file(name, self.storage):
+                        continue
+                yield 'original', name
+
+    def orphan_thumbnails(self):
+        storage = default.storage
+        for names in batches(
+            self.old_files(storage, sorl_settings.THUMBNAIL_PREFIX),
+            self.batch_size,
+        ):
+            keys = {
+                add_prefix(ImageFile(name, storage).key): name
+                for name in names
+            }
+            known = set(KVStore.objects.filter(
+                key__in=keys
+            ).values_list('key', flat=True))
+            for key, name in keys.items():
+                if key in known:
+                    continue
+                if not self.dry_run:
+                    self.throttle()
+                    storage.delete(name)
+                yield 'thumbnail', name
@@ -0,0 +1,115 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+# Анимацию пересжатие сломает: такие форматы сохраняются как есть.
+KEEP_FORMATS = ('GIF',)
+# До какого размера уменьшать картинку при поиске основного цвета.
+COLOR_SAMPLE = (64, 64)
+
+
+def output_format():
+    """IMAGE_FORMAT, если Pillow умеет его кодировать, иначе JPEG."""
+    if settings.IMAGE_FORMAT == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return settings.IMAGE_FORMAT
+
+
+def normalize_upload(upload):
+    """Готовит загруженную картинку к хранению.
+
+    Ориентация из EXIF применяется к пикселям, метаданные
+    отбрасываются, стороны ограничиваются IMAGE_MAX_SIZE, результат
+    пересжимается в IMAGE_FORMAT. Большие JPEG декодируются в режиме
+    draft — сразу в уменьшенном масштабе.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    if image.format in KEEP_FORMATS:
+        upload.seek(0)
+        return upload
+    limit = settings.IMAGE_MAX_SIZE
+    if image.format == 'JPEG':
+        image.draft('RGB', (limit, limit))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    image_format = output_format()
+    if image_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        image = flatten(image, keep_alpha=image_format != 'JPEG')
+    content = BytesIO()
+    image.save(
+        content,
+        image_format,
+        quality=settings.IMAGE_QUALITY,
+        icc_profile=image.info.get('icc_profile'),
+    )
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    extension = 'webp' if image_format == 'WEBP' else 'jpg'
+    return ContentFile(content.getvalue(), name=f'{name}.{extension}')
+
+
+def flatten(image, keep_alpha):
+    """RGB/RGBA для кодировщика; прозрачность без альфы — на белом."""
+    has_alpha = (
+        image.mode in ('RGBA', 'LA', 'PA')
+        or 'transparency' in image.info
+    )
+    if not has_alpha:
+        return image.convert('RGB')
+    image = image.convert('RGBA')
+    if keep_alpha:
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def file_hash(file):
+    """SHA-256 файла; запоминается на объекте файла.
+
+    Загрузку хешируют describe_image, ссылка MediaFile и save
+    хранилища — читается она один раз.
+    """
+    cached = getattr(file, 'sha256', None)
+    if cached:
+        return cached
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(64 * 1024), b''):
+        digest.update(chunk)
+    file.seek(0)
+    file.sha256 = digest.hexdigest()
+    return file.sha256
+
+
+def dominant_color(image):
+    """Самый частый из четырёх цветов палитры уменьшенной копии."""
+    sample = image.convert('RGB')
+    sample.thumbnail(COLOR_SAMPLE)
+    palette = sample.quantize(colors=4)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def describe_image(file):
+    """Ширина, высота, основной цвет и SHA-256 файла картинки.
+
+    Нечитаемая картинка даёт только хеш: разметка обойдётся без
+    размеров и заглушки.
+    """
+    metadata = {
+        'width': None, 'height': None, 'color': '', 'hash': file_hash(file)
+    }
+    try:
+        with Image.open(file) as image:
+            metadata['width'], metadata['height'] = image.size
+            metadata['color'] = dominant_color(image)
+    except (OSError, ValueError):
+        pass
+    file.seek(0)
+    return metadata
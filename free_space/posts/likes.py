@@ -0,0 +1,124 @@
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+from .models import Like, LikeCounterShard, Post
+
+
+def change_like_count(post_id, delta):
+    """Атомарно сдвигает счётчик лайков поста на delta.
+
+    Горячие посты (like_count не меньше LIKE_COUNTER_HOT) пишут
+    в случайный шард, чтобы не упираться в блокировку строки Post.
+    """
+    if not Post.objects.filter(
+        id=post_id, like_count__lt=settings.LIKE_COUNTER_HOT
+    ).update(like_count=F('like_count') + delta):
+        change_shard(post_id, delta)
+
+
+def change_shard(post_id, delta):
+    shard = random.randrange(settings.LIKE_COUNTER_SHARDS)
+    shards = LikeCounterShard.objects.filter(post_id=post_id, shard=shard)
+    if shards.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            LikeCounterShard.objects.create(
+                post_id=post_id, shard=shard, count=delta
+            )
+    except IntegrityError:
+        shards.update(count=F('count') + delta)
+
+
+def toggled_state(post, like, delta):
+    """Состояние лайка после переключения без повторного чтения поста.
+
+    like_count поста загружен до переключения; если пост не горячий,
+    сдвиг delta ушёл в него же, иначе — в шард, и его учтёт сумма шардов.
+    """
+    if post.like_count < settings.LIKE_COUNTER_HOT:
+        post.like_count += delta
+    return {
+        'count': PageLikes([post], None).counts[post.id],
+        'liked': like is not None,
+        'like_id': like and like.id,
+    }
+
+
+def like_count_subquery():
+    """Точное число лайков поста по таблице Like, для update()."""
+    return Coalesce(Subquery(
+        Like.objects.filter(
+            blog_post=OuterRef('pk'), like=True
+        ).order_by().values('blog_post').annotate(
+            total=Count('id')
+        ).values('total')
+    ), 0)
+
+
+def shard_sum_subquery():
+    """Сумма шардов счётчика поста, для update()."""
+    return Coalesce(Subquery(
+        LikeCounterShard.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(
+            total=Sum('count')
+        ).values('total')
+    ), 0)
+
+
+class PageLikes:
+    """Лайки всех постов страницы не более чем двумя запросами.
+
+    Счётчики берутся из Post.like_count (плюс шарды горячих постов),
+    отметки читателя — одним запросом по Like. Запросы выполняются
+    лениво, при первом обращении шаблона.
+    """
+
+    def __init__(self, posts, user):
+        self.posts = posts
+        self.user = user
+
+    @cached_property
+    def post_ids(self):
+        return [post.id for post in self.posts]
+
+    @cached_property
+    def counts(self):
+        counts = {post.id: post.like_count for post in self.posts}
+        hot = [
+            post_id for post_id, count in counts.items()
+            if count >= settings.LIKE_COUNTER_HOT
+        ]
+        if hot:
+            for post_id, total in LikeCounterShard.objects.filter(
+                post_id__in=hot
+            ).order_by().values('post_id').annotate(
+                total=Sum('count')
+            ).values_list('post_id', 'total'):
+                counts[post_id] += total
+        return counts
+
+    @cached_property
+    def liked(self):
+        if not self.user.is_authenticated:
+            return {}
+        return dict(
+            Like.objects.filter(
+                blog_post_id__in=self.post_ids,
+                liked_by=self.user,
+                like=True,
+            ).values_list('blog_post_id', 'id')
+        )
+
+    def state(self, post_id):
+        return {
+            'count': self.counts.get(post_id, 0),
+            'liked': post_id in self.liked,
+            'like_id': self.liked.get(post_id),
+        }
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from posts.garbage import Collector
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT картинки без постов и миниатюры, '
+        'на которые не ссылается хранилище ключей sorl.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько файлов сверять с базой за один запрос.'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Файлы моложе стольких секунд не трогать.'
+        )
+        parser.add_argument(
+            '--rate', type=float, default=0,
+            help='Не больше стольких удалений в секунду, 0 — без ограничения.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать лишние файлы, ничего не удаляя.'
+        )
+
+    def handle(self, *args, batch_size, min_age, rate, dry_run, **options):
+        collector = Collector(
+            batch_size=batch_size, min_age=min_age, rate=rate, dry_run=dry_run
+        )
+        removed = {'original': 0, 'thumbnail': 0}
+        for kind, name in collector.collect():
+            removed[kind] += 1
+            if dry_run or options['verbosity'] > 1:
+                self.stdout.write(name)
+        verb = 'Найдено лишних' if dry_run else 'Удалено'
+        self.stdout.write(
+            f'{verb} оригиналов: {removed["original"]}, '
+            f'миниатюр: {removed["thumbnail"]}'
+        )
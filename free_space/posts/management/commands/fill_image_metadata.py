@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import describe_image
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры, основной цвет и хеш картинок постов, '
+        'загруженных до появления этих полей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько постов читать из базы за один запрос.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        pending = Post.objects.exclude(image='').filter(image_hash='')
+        last_id = 0
+        filled = 0
+        missing = 0
+        while True:
+            posts = list(pending.filter(id__gt=last_id).order_by(
+                'id'
+            ).only('id', 'image')[:batch_size])
+            if not posts:
+                break
+            for post in posts:
+                try:
+                    with post.image.open('rb') as file:
+                        metadata = describe_image(file)
+                except OSError:
+                    missing += 1
+                    continue
+                Post.objects.filter(id=post.id).update(**{
+                    f'image_{field}': value
+                    for field, value in metadata.items()
+                })
+                filled += 1
+            last_id = posts[-1].id
+        self.stdout.write(
+            f'Заполнено постов: {filled}, файлов не найдено: {missing}'
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие миниатюры картинок постов: загруженных '
+        'до генерации после сохранения или потерявших миниатюры '
+        'при смене хранилища.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько постов читать из базы за один запрос.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        posts = Post.objects.exclude(image='').order_by('id').only(
+            'id', 'image'
+        )
+        last_id = 0
+        generated = 0
+        ready = 0
+        missing = 0
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            # Одну картинку делят несколько постов: хватит одного.
+            images = {post.image.name: post.image for post in batch}
+            for name, image in images.items():
+                if thumbnails.complete(image):
+                    ready += 1
+                    continue
+                # Пропавший файл sorl не генерирует, а только логирует.
+                thumbnails.generate(name)
+                if thumbnails.complete(image):
+                    generated += 1
+                    if options['verbosity'] > 1:
+                        self.stdout.write(name)
+                else:
+                    missing += 1
+            last_id = batch[-1].id
+        self.stdout.write(
+            f'Созданы миниатюры картинок: {generated}, '
+            f'уже были готовы: {ready}, файлов не найдено: {missing}'
+        )
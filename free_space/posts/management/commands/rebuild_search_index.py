@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс постов пачками '
+        'и удаляет записи удалённых постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов индексировать за одну транзакцию.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        pruned = search.prune()
+        total = search.reindex(Post.objects.all(), batch_size)
+        self.stdout.write(
+            f'Проиндексировано постов: {total}, удалено записей: {pruned}'
+        )
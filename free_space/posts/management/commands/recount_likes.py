@@ -0,0 +1,57 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from posts.likes import like_count_subquery, shard_sum_subquery
+from posts.models import LikeCounterShard, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает Post.like_count по таблице Like пачками '
+        'и сворачивает шарды горячих постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов пересчитывать за одну транзакцию.'
+        )
+
+    def recount(self, ids):
+        # Шарды, которые сворачиваются, заблокированы: параллельный лайк
+        # ждёт коммита и пишет в новый шард, а не в удалённый.
+        folded = defaultdict(int)
+        locked = []
+        for shard_id, post_id, count in LikeCounterShard.objects.filter(
+            post_id__in=ids
+        ).select_for_update().values_list('id', 'post_id', 'count'):
+            folded[post_id] += count
+            locked.append(shard_id)
+        # Лайки и шарды считаются одним запросом, в одном снимке: шард,
+        # появившийся после блокировки, остаётся и не учитывается дважды.
+        Post.objects.filter(id__in=ids).update(
+            like_count=like_count_subquery() - shard_sum_subquery()
+        )
+        for post_id, count in folded.items():
+            Post.objects.filter(id=post_id).update(
+                like_count=F('like_count') + count
+            )
+        LikeCounterShard.objects.filter(id__in=locked).delete()
+
+    def handle(self, *args, batch_size, **options):
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(Post.objects.filter(
+                id__gt=last_id
+            ).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                self.recount(ids)
+            last_id = ids[-1]
+            total += len(ids)
+        self.stdout.write(f'Пересчитано постов: {total}')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+from posts.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики профилей AuthorStats по постам, '
+        'подпискам и комментариям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько профилей читать за один запрос.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(AuthorStats.objects.filter(
+                author_id__gt=last_id
+            ).order_by('author_id').values_list('author_id', flat=True)[
+                :batch_size
+            ])
+            if not ids:
+                break
+            for author_id in ids:
+                stats.recount(author_id)
+            last_id = ids[-1]
+            total += len(ids)
+        self.stdout.write(f'Пересчитано профилей: {total}')
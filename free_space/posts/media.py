@@ -0,0 +1,46 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+
+class MediaFileManager(models.Manager):
+    """Счётчики ссылок постов на файлы картинок."""
+
+    def acquire(self, name):
+        if self.filter(name=name).update(refs=F('refs') + 1):
+            return
+        try:
+            with transaction.atomic():
+                self.create(name=name, refs=1)
+        except IntegrityError:
+            self.filter(name=name).update(refs=F('refs') + 1)
+
+    def release(self, name, storage):
+        """Снимает ссылку; последняя ссылка удаляет файл после коммита.
+
+        Файлы без записи (загруженные до счётчиков) не трогаются —
+        их разбирает сборщик мусора.
+        """
+        if not self.filter(name=name, refs__gt=0).update(
+            refs=F('refs') - 1
+        ):
+            return
+        if self.filter(name=name, refs=0).exists():
+            transaction.on_commit(lambda: self.remove_file(name, storage))
+
+    def remove_file(self, name, storage):
+        """Удаляет файл, если ссылок так и нет; True — если удалил.
+
+        Строка счётчика блокируется до конца удаления: acquire той же
+        картинки ждёт его и затем сохраняет файл заново.
+        """
+        with transaction.atomic():
+            if self.select_for_update().filter(
+                name=name, refs=0
+            ).first() is None:
+                return False
+            delete_thumbnails(ImageFile(name, storage), delete_file=False)
+            storage.delete(name)
+            self.filter(name=name).delete()
+        return True
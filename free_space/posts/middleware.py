@@ -0,0 +1,116 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+
+PAGE_KEY = 'page:{digest}'
+LOCK_KEY = 'page-lock:{digest}'
+# Как часто проверять запись, которую строит другой запрос (секунды).
+WAIT_STEP = 0.05
+
+
+def page_keys(uri):
+    """Ключи записи страницы и блокировки её перестройки."""
+    digest = hashlib.md5(uri.encode()).hexdigest()
+    return PAGE_KEY.format(digest=digest), LOCK_KEY.format(digest=digest)
+
+
+class AnonymousPageCacheMiddleware:
+    """Кеш целых страниц для гостей с stale-while-revalidate.
+
+    Кешируются GET/HEAD гостей к view из PAGE_CACHE_TTLS. Запись
+    устаревает по своему TTL или при смене версий областей страницы
+    (page_versions из conditional_page); тогда перестраивает её один
+    запрос (взявший блокировку), а остальные в это время получают
+    устаревшую копию. Без записи остальные до PAGE_CACHE_WAIT секунд
+    ждут, пока её построит владелец блокировки.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        match = self.match(request)
+        ttl = match and settings.PAGE_CACHE_TTLS.get(match.view_name)
+        if ttl is None:
+            return self.get_response(request)
+        key, lock = page_keys(request.build_absolute_uri())
+        page_versions = getattr(match.func, 'page_versions', None)
+        version = page_versions and page_versions(
+            request, *match.args, **match.kwargs
+        )
+        entry = cache.get(key)
+        if entry is not None:
+            fresh_until, entry_version, *stored = entry
+            if fresh_until > time.time() and entry_version == version:
+                return self.restore(*stored, 'hit')
+        token = uuid.uuid4().hex
+        owner = cache.add(lock, token, settings.PAGE_CACHE_LOCK_TIMEOUT)
+        if not owner:
+            if entry is not None:
+                return self.restore(*entry[2:], 'stale')
+            entry = self.wait(key)
+            if entry is not None:
+                return self.restore(*entry[2:], 'hit')
+        try:
+            response = self.get_response(request)
+            if self.cacheable(response):
+                patch_vary_headers(response, ('Cookie',))
+                cache.set(key, (
+                    time.time() + ttl,
+                    version,
+                    response.content,
+                    response.status_code,
+                    list(response.items()),
+                ), ttl + settings.PAGE_CACHE_STALE)
+        finally:
+            # Блокировка могла истечь и достаться другому запросу.
+            if owner and cache.get(lock) == token:
+                cache.delete(lock)
+        response['X-Page-Cache'] = 'miss'
+        return response
+
+    @staticmethod
+    def wait(key):
+        """Запись, построенная за PAGE_CACHE_WAIT другим запросом."""
+        deadline = time.monotonic() + settings.PAGE_CACHE_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    @staticmethod
+    def match(request):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+        ):
+            return None
+        try:
+            return resolve(request.path_info)
+        except Resolver404:
+            return None
+
+    @staticmethod
+    def cacheable(response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and 'private' not in response.get('Cache-Control', '')
+        )
+
+    @staticmethod
+    def restore(content, status, headers, state):
+        response = HttpResponse(content, status=status)
+        for header, value in headers:
+            response[header] = value
+        response['X-Page-Cache'] = state
+        return response
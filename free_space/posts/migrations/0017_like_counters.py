@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_like_counts(apps, schema_editor):
+    Like = apps.get_model('posts', 'Like')
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(like_count=Coalesce(Subquery(
+        Like.objects.filter(
+            blog_post=OuterRef('pk'), like=True
+        ).order_by().values('blog_post').annotate(
+            total=Count('id')
+        ).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.IntegerField(default=0, verbose_name='Лайков'),
+        ),
+        migrations.CreateModel(
+            name='LikeCounterShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Номер шарда')),
+                ('count', models.IntegerField(default=0, verbose_name='Лайков')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_shards', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Шард счётчика лайков',
+                'verbose_name_plural': 'Шарды счётчиков лайков',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='likecountershard',
+            constraint=models.UniqueConstraint(fields=('post', 'shard'), name='like_counter_shard'),
+        ),
+        migrations.RunPython(fill_like_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:56
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+GIN_INDEX = 'search_document_vector'
+
+
+def create_gin_index(apps, schema_editor):
+    # GIN есть только в Postgres; в SQLite поиск идёт по SearchTerm.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {GIN_INDEX} '
+            'ON posts_searchdocument USING gin (vector)'
+        )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('post', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True, verbose_name='Поисковый вектор')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковые документы',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('weight', models.FloatField(verbose_name='Вес')),
+                ('post', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Слово индекса',
+                'verbose_name_plural': 'Слова индекса',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='search_term'),
+        ),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
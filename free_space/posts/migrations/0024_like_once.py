@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:11
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    # Из повторов пары (пост, читатель) остаётся самый ранний
+    # лайк с like=True, а если таких нет — самая ранняя запись.
+    Like = apps.get_model('posts', 'Like')
+    Post = apps.get_model('posts', 'Post')
+    LikeCounterShard = apps.get_model('posts', 'LikeCounterShard')
+    duplicates = Like.objects.filter(
+        blog_post__isnull=False, liked_by__isnull=False
+    ).order_by().values('blog_post', 'liked_by').annotate(
+        rows=Count('id'),
+        first=Min('id'),
+        first_liked=Min('id', filter=Q(like=True)),
+    ).filter(rows__gt=1)
+    post_ids = set()
+    for pair in duplicates.iterator():
+        Like.objects.filter(
+            blog_post=pair['blog_post'], liked_by=pair['liked_by']
+        ).exclude(id=pair['first_liked'] or pair['first']).delete()
+        post_ids.add(pair['blog_post'])
+    if not post_ids:
+        return
+    # Удаление мимо сигналов: счётчики этих постов считаются заново.
+    LikeCounterShard.objects.filter(post_id__in=post_ids).delete()
+    Post.objects.filter(id__in=post_ids).update(like_count=Coalesce(Subquery(
+        Like.objects.filter(
+            blog_post=OuterRef('pk'), like=True
+        ).order_by().values('blog_post').annotate(
+            total=Count('id')
+        ).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_comment_post_created'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_likes, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('blog_post', 'liked_by'), name='like_once'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:14
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Индексы в Postgres строятся CONCURRENTLY, вне транзакции.
+    atomic = False
+
+    dependencies = [
+        ('posts', '0024_like_once'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='follow_author_user'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['-pub_date', '-id'], name='post_pub_date'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_date'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_date'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:20
+
+from django.db import migrations
+
+# Поиск '^поле' в админке — UPPER(поле::text) LIKE UPPER('начало%').
+# Postgres ведёт такой LIKE по индексу того же выражения с
+# text_pattern_ops; в SQLite индексов по выражению нет.
+PREFIX_INDEXES = (
+    ('auth_user_username_prefix', 'auth_user', 'username'),
+    ('auth_user_email_prefix', 'auth_user', 'email'),
+    ('posts_group_title_prefix', 'posts_group', 'title'),
+    ('posts_group_slug_prefix', 'posts_group', 'slug'),
+)
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, table, column in PREFIX_INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON {table} (UPPER({column}::text) text_pattern_ops)'
+            )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, _, _ in PREFIX_INDEXES:
+            schema_editor.execute(
+                f'DROP INDEX CONCURRENTLY IF EXISTS {name}'
+            )
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY не работает в транзакции.
+    atomic = False
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0025_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
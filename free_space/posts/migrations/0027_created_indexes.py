@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Индексы в Postgres строятся CONCURRENTLY, вне транзакции.
+    atomic = False
+
+    dependencies = [
+        ('posts', '0026_prefix_search_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='comment',
+            index=models.Index(fields=['-created', '-id'], name='comment_created'),
+        ),
+        AddIndexConcurrently(
+            model_name='like',
+            index=models.Index(fields=['-created', '-id'], name='like_created'),
+        ),
+    ]
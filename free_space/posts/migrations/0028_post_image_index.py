@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Индексы в Postgres строятся CONCURRENTLY, вне транзакции.
+    atomic = False
+
+    dependencies = [
+        ('posts', '0027_created_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['image'], name='post_image'),
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+
+from .images import describe_image
+from .media import MediaFileManager
+from .storage import ContentAddressedStorage
 
 
 User = get_user_model()
@@ -32,6 +37,18 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для карточек ленты: автор и группа тем же JOIN, из
+        колонок — только то, что читают карточка и кнопка лайков."""
+        return self.select_related('author', 'group').only(
+            'id', 'text', 'pub_date', 'modified', 'like_count',
+            'image', 'image_width', 'image_color',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__slug', 'group__title',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         help_text='Текст нового поста',
@@ -41,6 +58,10 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -59,19 +80,106 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to=settings.IMAGE_PLACEMENT,
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Метаданные картинки снимаются один раз при загрузке, чтобы
+    # рендер не открывал файл; width_field/height_field открывали бы
+    # его при каждой загрузке поста из базы.
+    image_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Ширина картинки'
+    )
+    image_height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Высота картинки'
+    )
+    image_color = models.CharField(
+        max_length=7,
+        blank=True,
+        verbose_name='Основной цвет картинки'
+    )
+    image_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='SHA-256 картинки'
+    )
+    like_count = models.IntegerField(
+        default=0,
+        verbose_name='Лайков'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Ленты листаются по (pub_date, id) от новых к старым: индексы
+        # отдают страницу без сортировки всей выборки.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'], name='post_author_date'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'], name='post_group_date'
+            ),
+            # Посты одной картинки: миниатюры готовы — сдвинуть modified.
+            models.Index(fields=['image'], name='post_image'),
+        ]
+
+    def save(self, *args, **kwargs):
+        uploaded = bool(self.image) and not self.image._committed
+        previous = None
+        if (uploaded or not self.image) and self.pk:
+            previous = Post.objects.filter(pk=self.pk).values_list(
+                'image', flat=True
+            ).first()
+        if not self.image:
+            self.image_width = self.image_height = None
+            self.image_color = self.image_hash = ''
+        elif uploaded:
+            for field, value in describe_image(self.image.file).items():
+                setattr(self, f'image_{field}', value)
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            # like_count сдвигают только F()-обновления лайков: полное
+            # сохранение загруженной раньше копии не вернёт старое число.
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != 'like_count'
+                and field.attname not in deferred
+            ]
+        with transaction.atomic():
+            # Ссылка берётся до записи файла: иначе remove_file после
+            # снятия последней ссылки удалит уже существующий файл,
+            # который save хранилища посчитал сохранённым.
+            if uploaded:
+                MediaFile.objects.acquire(self.image.storage.content_name(
+                    self.image.field.generate_filename(self, self.image.name),
+                    self.image.file,
+                ))
+            super().save(*args, **kwargs)
+            # Старая ссылка снимается после новой: при повторной
+            # загрузке того же файла счётчик не падает до нуля.
+            if previous:
+                MediaFile.objects.release(previous, self.image.storage)
 
     def __str__(self):
         return INFO_ABOUT_POST.format(
             text=self.text,
             author=self.author.username,
-            group=self.group.title
+            group=self.group.title if self.group else '',
         )
 
 
@@ -102,6 +210,16 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created',
+            ),
+            # Список админки: сортировка и date_hierarchy по дате.
+            models.Index(
+                fields=['-created', '-id'], name='comment_created'
+            ),
+        ]
 
     def __str__(self):
         return COMMENT.format(
@@ -134,6 +252,11 @@ class Follow(models.Model):
                 name='Невозможность подписки на себя'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user'
+            ),
+        ]
 
     def __str__(self):
         return SUBSCRIPTION.format(
@@ -167,6 +290,198 @@ class Like(models.Model):
     class Meta:
         verbose_name = 'Лайк'
         verbose_name_plural = 'Лайки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['blog_post', 'liked_by'], name='like_once'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['-created', '-id'], name='like_created'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.liked_by}: {self.blog_post} {self.like}'
+
+
+class LikeCounterShard(models.Model):
+    """Доля счётчика лайков горячего поста.
+
+    Итог = Post.like_count + сумма шардов; параллельные лайки пишут
+    в разные строки и не ждут блокировку одной строки Post.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='like_shards',
+        verbose_name='Пост'
+    )
+    shard = models.PositiveSmallIntegerField(
+        verbose_name='Номер шарда'
+    )
+    count = models.IntegerField(
+        default=0,
+        verbose_name='Лайков'
+    )
+
+    class Meta:
+        verbose_name = 'Шард счётчика лайков'
+        verbose_name_plural = 'Шарды счётчиков лайков'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'shard'], name='like_counter_shard'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}#{self.shard}: {self.count}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации поста'
+    )
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'], name='timeline_user_date'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class AuthorStats(models.Model):
+    """Счётчики профиля автора, которые поддерживают записи в ленте."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор',
+    )
+    posts_count = models.IntegerField(
+        default=0,
+        verbose_name='Постов'
+    )
+    following_count = models.IntegerField(
+        default=0,
+        verbose_name='Подписок'
+    )
+    followers_count = models.IntegerField(
+        default=0,
+        verbose_name='Подписчиков'
+    )
+    comments_count = models.IntegerField(
+        default=0,
+        verbose_name='Комментариев'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.author_id}: {self.posts_count}'
+
+
+class SearchDocument(models.Model):
+    """Поисковый документ поста для Postgres (tsvector под GIN-индексом).
+
+    Внешнего ключа в базе нет: запись удаляет сигнал удаления поста,
+    и перестройка индекса во время каскадного удаления не мешает ему.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='search_document',
+        verbose_name='Пост',
+    )
+    vector = SearchVectorField(
+        null=True,
+        verbose_name='Поисковый вектор'
+    )
+
+    class Meta:
+        verbose_name = 'Поисковый документ'
+        verbose_name_plural = 'Поисковые документы'
+
+    def __str__(self):
+        return str(self.post_id)
+
+
+class SearchTerm(models.Model):
+    """Запись инвертированного индекса (SQLite): слово, пост и вес."""
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Слово'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='search_terms',
+        verbose_name='Пост',
+    )
+    weight = models.FloatField(
+        verbose_name='Вес'
+    )
+
+    class Meta:
+        verbose_name = 'Слово индекса'
+        verbose_name_plural = 'Слова индекса'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'], name='search_term'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.term}: {self.post_id}'
+
+
+class MediaFile(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него ссылаются."""
+    name = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Файл'
+    )
+    refs = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ссылок'
+    )
+
+    objects = MediaFileManager()
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
 
     def __str__(self):
-        return f'{self.liked_by}: {self.blog_post} {self.like}'
\ No newline at end of file
+        return f'{self.name}: {self.refs}'
@@ -0,0 +1,252 @@
+import math
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorField,
+)
+from django.db import IntegrityError, connection, transaction
+from django.db.models import (
+    Case, Count, F, FloatField, Func, Prefetch, Sum, TextField, Value, When,
+)
+from django.db.models.functions import Cast
+
+from .models import Comment, Post, SearchDocument, SearchTerm
+
+# Веса частей документа — как у ts_rank для меток A, B и C.
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2}
+TERM_LENGTH = 64
+WORD = re.compile(r'\w+')
+
+
+def nothing():
+    return Post.objects.annotate(
+        rank=Value(0.0, output_field=FloatField())
+    ).none()
+
+
+def tokenize(text):
+    return [
+        word[:TERM_LENGTH] for word
+        in WORD.findall(text.lower().replace('ё', 'е'))
+        if len(word) > 1
+    ]
+
+
+def documents(post_ids):
+    """(id поста, [(метка веса, текст), ...]) для существующих постов."""
+    posts = Post.objects.filter(id__in=post_ids).select_related(
+        'group'
+    ).prefetch_related(Prefetch(
+        'comments', queryset=Comment.objects.only('post_id', 'text')
+    ))
+    for post in posts:
+        yield post.id, [
+            ('A', post.text),
+            ('B', post.group.title if post.group else ''),
+            ('C', ' '.join(comment.text for comment in post.comments.all())),
+        ]
+
+
+class PostgresBackend:
+    """tsvector в SearchDocument под GIN-индексом, ранг — ts_rank."""
+    model = SearchDocument
+
+    def index(self, post_ids):
+        config = settings.SEARCH_CONFIG
+        for post_id, parts in documents(post_ids):
+            vector = None
+            for weight, text in parts:
+                part = SearchVector(
+                    Value(text, output_field=TextField()),
+                    weight=weight, config=config,
+                )
+                vector = part if vector is None else vector + part
+            SearchDocument.objects.update_or_create(
+                post_id=post_id, defaults={'vector': vector}
+            )
+
+    def remove(self, post_ids):
+        SearchDocument.objects.filter(post_id__in=post_ids).delete()
+
+    def change_comment(self, post_id, text, sign):
+        # Из tsvector не вычесть слова одного комментария: удаление
+        # (редкое по сравнению с добавлением) пересобирает документ.
+        if sign < 0:
+            self.index([post_id])
+            return
+        SearchDocument.objects.filter(post_id=post_id).update(vector=Func(
+            F('vector'),
+            SearchVector(
+                Value(text, output_field=TextField()),
+                weight='C', config=settings.SEARCH_CONFIG,
+            ),
+            template='%(expressions)s',
+            arg_joiner=' || ',
+            output_field=SearchVectorField(),
+        ))
+
+    def search(self, text):
+        query = SearchQuery(text, config=settings.SEARCH_CONFIG)
+        # float4 из ts_rank приводится к double: иначе значение ранга
+        # в курсоре не совпадёт с ним же в условии следующей страницы.
+        return Post.objects.filter(search_document__vector=query).annotate(
+            rank=Cast(
+                SearchRank(F('search_document__vector'), query),
+                FloatField(),
+            )
+        )
+
+
+class InvertedIndexBackend:
+    """Инвертированный индекс в SearchTerm для баз без полнотекста.
+
+    Вес слова в посте — log(1 + сумма весов его вхождений), ранг —
+    сумма весов слов запроса с поправкой на их частоту по индексу.
+    Находятся посты, содержащие все слова запроса.
+    """
+    model = SearchTerm
+
+    def index(self, post_ids):
+        terms = []
+        for post_id, parts in documents(post_ids):
+            weights = defaultdict(float)
+            for weight, text in parts:
+                for term in tokenize(text):
+                    weights[term] += WEIGHTS[weight]
+            terms.extend(
+                SearchTerm(
+                    post_id=post_id, term=term, weight=math.log1p(value)
+                )
+                for term, value in weights.items()
+            )
+        with transaction.atomic():
+            self.remove(post_ids)
+            SearchTerm.objects.bulk_create(terms)
+
+    def remove(self, post_ids):
+        SearchTerm.objects.filter(post_id__in=post_ids).delete()
+
+    def change_comment(self, post_id, text, sign):
+        """Прибавляет (sign=1) или вычитает (-1) слова комментария.
+
+        Читаются и пишутся только строки слов этого комментария, сколько
+        бы комментариев ни было у поста.
+        """
+        deltas = defaultdict(float)
+        for term in tokenize(text):
+            deltas[term] += sign * WEIGHTS['C']
+        if not deltas:
+            return
+        try:
+            with transaction.atomic():
+                rows = {
+                    row.term: row for row in SearchTerm.objects.filter(
+                        post_id=post_id, term__in=deltas
+                    ).select_for_update()
+                }
+                created, changed, emptied = [], [], []
+                for term, delta in deltas.items():
+                    row = rows.get(term)
+                    total = delta + (math.expm1(row.weight) if row else 0)
+                    if total < 1e-6:
+                        if row:
+                            emptied.append(row.id)
+                    elif row:
+                        row.weight = math.log1p(total)
+                        changed.append(row)
+                    else:
+                        created.append(SearchTerm(
+                            post_id=post_id, term=term,
+                            weight=math.log1p(total),
+                        ))
+                SearchTerm.objects.filter(id__in=emptied).delete()
+                SearchTerm.objects.bulk_update(changed, ['weight'])
+                SearchTerm.objects.bulk_create(created)
+        except IntegrityError:
+            # Слово успел добавить параллельный комментарий.
+            self.index([post_id])
+
+    def search(self, text):
+        terms = list(
+            dict.fromkeys(tokenize(text))
+        )[:settings.SEARCH_MAX_TERMS]
+        frequencies = dict(SearchTerm.objects.filter(
+            term__in=terms
+        ).values_list('term').annotate(Count('id')))
+        if not terms or len(frequencies) < len(terms):
+            return nothing()
+        rank = Sum(Case(
+            *(
+                When(
+                    search_terms__term=term,
+                    then=F('search_terms__weight') / math.log2(1 + frequency),
+                )
+                for term, frequency in frequencies.items()
+            ),
+            output_field=FloatField(),
+        ))
+        # Округление убирает разницу в последних битах суммы между
+        # запросами: ранг из курсора должен совпасть с рангом в базе.
+        return Post.objects.filter(search_terms__term__in=terms).annotate(
+            rank=Func(rank, 6, function='ROUND', output_field=FloatField()),
+            matched=Count('search_terms'),
+        ).filter(matched=len(terms))
+
+
+def backend():
+    if connection.vendor == 'postgresql':
+        return PostgresBackend()
+    return InvertedIndexBackend()
+
+
+def index(post_ids):
+    backend().index(post_ids)
+
+
+def remove(post_ids):
+    backend().remove(post_ids)
+
+
+def index_on_commit(post_ids):
+    """Индексирует посты после коммита, вне транзакции запроса."""
+    post_ids = list(post_ids)
+    transaction.on_commit(lambda: index(post_ids))
+
+
+def change_comment_on_commit(post_id, text, sign):
+    """Прибавляет или вычитает слова комментария после коммита."""
+    transaction.on_commit(
+        lambda: backend().change_comment(post_id, text, sign)
+    )
+
+
+def reindex(queryset, batch_size=1000):
+    """Переиндексирует посты queryset пачками по id, возвращает их число."""
+    last_id = 0
+    total = 0
+    while True:
+        ids = list(queryset.filter(
+            id__gt=last_id
+        ).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        with transaction.atomic():
+            index(ids)
+        last_id = ids[-1]
+        total += len(ids)
+
+
+def prune():
+    """Удаляет записи индекса, оставшиеся от удалённых постов."""
+    return backend().model.objects.exclude(
+        post_id__in=Post.objects.values('id')
+    ).delete()[0]
+
+
+def search(text):
+    """Посты по запросу с аннотацией rank; пустой запрос — ничего."""
+    if not text.strip():
+        return nothing()
+    return backend().search(text)
@@ -0,0 +1,136 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import search, stats, timeline
+from .caching import bump_versions, post_scopes
+from .likes import change_like_count
+from .models import Comment, Follow, Group, Like, MediaFile, Post
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    # Пост, ушедший из группы, меняет и её ленту.
+    instance.previous_group = None
+    if not instance._state.adding:
+        instance.previous_group = Post.objects.filter(
+            id=instance.id
+        ).values_list('group__slug', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    scopes = post_scopes(instance)
+    if getattr(instance, 'previous_group', None):
+        scopes.append(f'group:{instance.previous_group}')
+    bump_versions(*scopes)
+    search.index_on_commit([instance.id])
+    if created:
+        timeline.fan_out(instance)
+        stats.change(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def post_removed(sender, instance, **kwargs):
+    bump_versions(*post_scopes(instance))
+    search.remove([instance.id])
+    stats.change(instance.author_id, posts_count=-1)
+    if instance.image:
+        MediaFile.objects.release(instance.image.name, instance.image.storage)
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, **kwargs):
+    instance.previous_title = None
+    if not instance._state.adding:
+        instance.previous_title = Group.objects.filter(
+            id=instance.id
+        ).values_list('title', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    # Название группы есть на карточках всех страниц.
+    bump_versions('site')
+    # Из группы в индекс попадает только название; посты
+    # переиндексируются после коммита пачками, каждая в своей транзакции.
+    if instance.title != instance.previous_title:
+        posts = instance.posts.all()
+        transaction.on_commit(lambda: search.reindex(posts))
+
+
+def bump_comment_scopes(comment):
+    # Число комментариев автора — в шапке его профиля.
+    bump_versions(
+        f'post:{comment.post_id}', f'author:{comment.author.username}'
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    bump_comment_scopes(instance)
+    if instance.post_id and created:
+        search.change_comment_on_commit(instance.post_id, instance.text, 1)
+    elif instance.post_id:
+        # Правка (только из админки) пересобирает документ поста.
+        search.index_on_commit([instance.post_id])
+    if created:
+        stats.change(instance.author_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_removed(sender, instance, **kwargs):
+    bump_comment_scopes(instance)
+    # При каскадном удалении поста его записи индекса потом сотрёт
+    # post_removed, поэтому внешнего ключа у индекса нет.
+    if instance.post_id:
+        search.change_comment_on_commit(instance.post_id, instance.text, -1)
+    stats.change(instance.author_id, comments_count=-1)
+
+
+def bump_follow_scopes(follow):
+    bump_versions(
+        f'author:{follow.user.username}', f'author:{follow.author.username}'
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    bump_follow_scopes(instance)
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+        stats.change(instance.user_id, following_count=1)
+        stats.change(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_removed(sender, instance, **kwargs):
+    bump_follow_scopes(instance)
+    timeline.purge(instance.user_id, instance.author_id)
+    # Автор мог выпасть из популярных: его посты нужно раздать.
+    author_id = instance.author_id
+    transaction.on_commit(lambda: timeline.demote(author_id))
+    stats.change(instance.user_id, following_count=-1)
+    stats.change(instance.author_id, followers_count=-1)
+
+
+def bump_like_scopes(like):
+    # Счётчики в лентах поправит like_states, страницы лент не меняются.
+    if like.blog_post_id:
+        bump_versions(f'post:{like.blog_post_id}')
+
+
+@receiver(post_save, sender=Like)
+def like_saved(sender, instance, created, **kwargs):
+    bump_like_scopes(instance)
+    if created and instance.like and instance.blog_post_id:
+        change_like_count(instance.blog_post_id, 1)
+
+
+@receiver(post_delete, sender=Like)
+def like_removed(sender, instance, **kwargs):
+    bump_like_scopes(instance)
+    if instance.like and instance.blog_post_id:
+        change_like_count(instance.blog_post_id, -1)
@@ -0,0 +1,60 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import AuthorStats, Comment, Follow, Post
+
+
+def change(author_id, **deltas):
+    """Сдвигает счётчики автора через F(); отсутствующую запись не
+    создаёт — её соберёт for_author при первом чтении."""
+    AuthorStats.objects.filter(author_id=author_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def counts(author_id):
+    return {
+        'posts_count': Post.objects.filter(author_id=author_id).count(),
+        'following_count': Follow.objects.filter(user_id=author_id).count(),
+        'followers_count': Follow.objects.filter(
+            author_id=author_id
+        ).count(),
+        'comments_count': Comment.objects.filter(
+            author_id=author_id
+        ).count(),
+    }
+
+
+def recount(author_id):
+    """Пересчитывает счётчики под блокировкой строки.
+
+    change() параллельных транзакций ждёт конца подсчёта и ложится
+    сверху, а уже выполненные сдвиги перекрываются точным числом.
+    """
+    with transaction.atomic():
+        stats = AuthorStats.objects.select_for_update().get(
+            author_id=author_id
+        )
+        for field, value in counts(author_id).items():
+            setattr(stats, field, value)
+        stats.save()
+    return stats
+
+
+def rebuild(author_id):
+    # Строка создаётся до подсчёта: сдвиги, пришедшие во время него,
+    # не пропадут в change() из-за отсутствующей записи.
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(author_id=author_id)
+    except IntegrityError:
+        return AuthorStats.objects.get(author_id=author_id)
+    return recount(author_id)
+
+
+def for_author(author):
+    """Счётчики профиля одним запросом."""
+    try:
+        return AuthorStats.objects.get(author=author)
+    except AuthorStats.DoesNotExist:
+        return rebuild(author.id)
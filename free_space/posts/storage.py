@@ -0,0 +1,39 @@
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from .images import file_hash
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы называются SHA-256 содержимого: <папка>/<ab>/<sha256>.<ext>.
+
+    Одинаковая картинка хранится один раз, сколько бы постов её ни
+    загрузили, и у всех этих постов общие миниатюры sorl (их имена
+    выводятся из имени исходника). Когда файл можно удалить, решает
+    счётчик ссылок MediaFile.
+    """
+
+    def content_name(self, name, content):
+        """Имя, под которым save сохранит content."""
+        digest = file_hash(content)
+        directory, filename = posixpath.split(name)
+        return posixpath.join(
+            directory,
+            digest[:2],
+            f'{digest}{os.path.splitext(filename)[1].lower()}',
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
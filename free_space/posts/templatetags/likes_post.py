@@ -1,31 +1,17 @@
 from django import template
 
-from ..models import Like
+from ..likes import PageLikes
+from ..models import Post
 
 register = template.Library()
 
-@register.simple_tag(takes_context=True)
-def is_liked(context, blog_post_id):
-    request = context['request']
-    try:
-        blog_likes = Like.objects.get(blog_post__id=blog_post_id, liked_by=request.user.id).like
-    except Exception as e:
-        blog_likes = False
-    return blog_likes
-
-
-@register.simple_tag()
-def count_likes(blog_post_id):
-    return Like.objects.filter(
-        blog_post__id=blog_post_id,
-        like=True
-    ).count()
-
 
 @register.simple_tag(takes_context=True)
-def blog_likes_id(context, blog_post_id):
-    request = context['request']
-    return Like.objects.get(
-        blog_post__id=blog_post_id,
-        liked_by=request.user.id
-    ).id
\ No newline at end of file
+def like_count(context, blog_post_id):
+    """Число лайков из карты страницы page_likes."""
+    page_likes = context.get('page_likes')
+    if page_likes is None:
+        page_likes = PageLikes(
+            Post.objects.filter(id=blog_post_id), context['request'].user
+        )
+    return page_likes.counts.get(blog_post_id, 0)
@@ -0,0 +1,16 @@
+from django import template
+from django.conf import settings
+
+from .. import paginators
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page):
+    """Номера страниц вокруг page с краями; None — многоточие."""
+    return paginators.page_window(
+        page.number,
+        page.paginator.num_pages,
+        settings.PAGINATOR_ON_EACH_SIDE,
+    )
@@ -0,0 +1,54 @@
+from django import template
+from django.conf import settings
+
+from .. import thumbnails
+
+register = template.Library()
+
+CARD_SIZES = '(min-width: 992px) 960px, 100vw'
+
+
+def card_widths(post):
+    """Ширины вариантов без апскейла: шире оригинала — только меньший."""
+    widths = settings.CARD_IMAGE_WIDTHS
+    if not post.image_width:
+        return widths
+    return [
+        width for width in widths if width <= post.image_width
+    ] or widths[:1]
+
+
+@register.inclusion_tag('posts/includes/card_image.html')
+def card_image(post, lazy=True):
+    """<img> карточки: srcset из готовых вариантов, пока их нет — оригинал.
+
+    Рамка — пропорции CARD_IMAGE_SIZE, фон — основной цвет картинки,
+    так что место и заглушка известны до загрузки файла. Рендер не
+    читает медиа и не ждёт Pillow.
+    """
+    image = post.image
+    width, height = settings.CARD_IMAGE_SIZE
+    variants = [
+        thumbnail for thumbnail in (
+            thumbnails.ready(image, f'card_{variant}')
+            for variant in card_widths(post)
+        )
+        if thumbnail is not None
+    ] if image else []
+    if image and not variants:
+        thumbnails.request(image)
+    fallback = [
+        thumbnail for thumbnail in variants if thumbnail.width <= width
+    ]
+    return {
+        'image': image,
+        'src': (fallback or variants)[-1].url if variants else None,
+        'srcset': ', '.join(
+            f'{thumbnail.url} {thumbnail.width}w' for thumbnail in variants
+        ),
+        'sizes': CARD_SIZES,
+        'width': width,
+        'height': height,
+        'color': post.image_color,
+        'lazy': lazy,
+    }
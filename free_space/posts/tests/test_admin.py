@@ -0,0 +1,168 @@
+from unittest import mock
+
+from django.contrib.admin.models import DELETION, LogEntry
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import admin
+from ..models import Comment, Follow, Group, Like, Post, User
+
+ADMIN = 'admin'
+MODELS = ('post', 'comment', 'like', 'follow')
+
+
+class AdminScalingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.superuser = User.objects.create_superuser(
+            ADMIN, 'admin@example.com', 'password'
+        )
+        cls.admin = Client()
+        cls.admin.force_login(cls.superuser)
+
+    def setUp(self):
+        cache.clear()
+
+    def add_rows(self, count):
+        for _ in range(count):
+            number = User.objects.count()
+            author = User.objects.create_user(f'author-{number}')
+            post = Post.objects.create(
+                author=author,
+                group=Group.objects.create(
+                    title=f'Группа {number}',
+                    slug=f'group-{number}',
+                    description='Описание',
+                ),
+                text=f'Пост {number}',
+            )
+            Comment.objects.create(post=post, author=author, text='Текст')
+            Like.objects.create(blog_post=post, liked_by=author, like=True)
+            Follow.objects.create(user=self.superuser, author=author)
+
+    def queries(self, model):
+        with CaptureQueriesContext(connection) as context:
+            response = self.admin.get(
+                reverse(f'admin:posts_{model}_changelist')
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_changelist_queries_do_not_depend_on_rows(self):
+        '''Связанные объекты строк приходят JOIN, а не запросом на строку.'''
+        for model in MODELS:
+            with self.subTest(model=model):
+                self.add_rows(2)
+                few = self.queries(model)
+                self.add_rows(3)
+                self.assertEqual(self.queries(model), few)
+
+    def test_editable_group_shows_selected(self):
+        '''Группа строки выбрана в списке без отдельного запроса.'''
+        self.add_rows(1)
+        group = Group.objects.get()
+        self.assertContains(
+            self.admin.get(reverse('admin:posts_post_changelist')),
+            f'<option value="{group.pk}" selected>{group}</option>',
+            html=True,
+        )
+
+    def test_batched_delete_replaces_delete_selected(self):
+        '''Удаление пачками — после подтверждения, с журналом и сигналами.'''
+        self.add_rows(5)
+        url = reverse('admin:posts_like_changelist')
+        actions = self.admin.get(url).context['action_form'].fields[
+            'action'
+        ].choices
+        self.assertNotIn('delete_selected', dict(actions))
+        likes = list(Like.objects.values_list('id', flat=True)[:4])
+        confirmation = self.admin.post(url, {
+            'action': 'delete_in_batches', '_selected_action': likes,
+        })
+        self.assertContains(confirmation, 'Будет удалено объектов')
+        self.assertEqual(confirmation.context['count'], 4)
+        self.assertEqual(Like.objects.count(), 5)
+        with mock.patch.object(admin, 'DELETE_BATCH_SIZE', 3):
+            self.admin.post(url, {
+                'action': 'delete_in_batches',
+                '_selected_action': likes,
+                'post': 'yes',
+            })
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(
+            LogEntry.objects.filter(action_flag=DELETION).count(), 4
+        )
+        self.assertEqual(
+            sorted(Post.objects.values_list('like_count', flat=True)),
+            [0, 0, 0, 0, 1],
+        )
+
+    def test_batched_delete_of_all_rows_keeps_filters(self):
+        '''«Выбрать все» удаляет только строки отфильтрованного списка.'''
+        self.add_rows(4)
+        post = Post.objects.order_by('id').first()
+        url = (
+            reverse('admin:posts_post_changelist')
+            + f'?author__id__exact={post.author_id}'
+        )
+        data = {
+            'action': 'delete_in_batches',
+            'select_across': '1',
+            '_selected_action': [post.id],
+        }
+        self.assertEqual(self.admin.post(url, data).context['count'], 1)
+        self.admin.post(url, {**data, 'post': 'yes'})
+        self.assertFalse(Post.objects.filter(id=post.id).exists())
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_date_hierarchy(self):
+        '''Списки постов, комментариев и лайков листаются по датам.'''
+        self.add_rows(1)
+        post = Post.objects.get()
+        for model, field in (
+            ('post', 'pub_date'), ('comment', 'created'), ('like', 'created')
+        ):
+            with self.subTest(model=model):
+                response = self.admin.get(
+                    reverse(f'admin:posts_{model}_changelist'),
+                    {f'{field}__year': post.pub_date.year},
+                )
+                self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_posts_filter_by_author_prefix(self):
+        '''Автора поста ищет фильтр по началу логина, не поиск.'''
+        self.add_rows(3)
+        author = Post.objects.order_by('id').first().author
+        url = reverse('admin:posts_post_changelist')
+        response = self.admin.get(url, {
+            'author__username__startswith': author.username,
+            'q': 'Пост',
+        })
+        self.assertEqual(
+            [post.author for post in response.context['cl'].result_list],
+            [author],
+        )
+        self.assertContains(
+            response, f'value="{author.username}"'
+        )
+        self.assertEqual(
+            self.admin.get(url, {'q': author.username}).context[
+                'cl'
+            ].result_count,
+            0,
+        )
+
+    def test_author_autocomplete_searches_by_prefix(self):
+        '''Автодополнение авторов ищет по началу логина.'''
+        self.add_rows(1)
+        url = reverse('admin:auth_user_autocomplete')
+        self.assertEqual(
+            len(self.admin.get(url, {'term': 'author'}).json()['results']), 1
+        )
+        self.assertFalse(
+            self.admin.get(url, {'term': 'thor'}).json()['results']
+        )
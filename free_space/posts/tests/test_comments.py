@@ -0,0 +1,131 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+
+USERNAME = 'test-author'
+PAGE_SIZE = 3
+
+
+@override_settings(NUMB_COMMENTS_PAGE=PAGE_SIZE)
+class CommentListTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.post = Post.objects.create(
+            author=cls.author_of_post, text='Тестовый пост'
+        )
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(f'reader-{number}'),
+                text=f'Комментарий {number}',
+            )
+            for number in range(PAGE_SIZE * 2 + 1)
+        ][::-1]
+        cls.POST_DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
+        cls.COMMENT_LIST_URL = reverse(
+            'posts:comment_list', args=[cls.post.id]
+        )
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_page(self):
+        '''На странице поста — первая страница, новые сверху.'''
+        response = self.guest.get(self.POST_DETAIL_URL)
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.comments[:PAGE_SIZE])
+        self.assertContains(
+            response, f'{self.COMMENT_LIST_URL}?cursor={comments.next_cursor}'
+        )
+
+    def test_fragment_pages_through_comments(self):
+        '''Фрагмент с курсором отдаёт следующие страницы до конца.'''
+        cursor = self.guest.get(
+            self.POST_DETAIL_URL
+        ).context['comments'].next_cursor
+        loaded = []
+        while cursor:
+            response = self.guest.get(
+                self.COMMENT_LIST_URL, {'cursor': cursor}
+            )
+            self.assertTemplateUsed(response, 'posts/includes/comments.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            comments = response.context['comments']
+            loaded.extend(comments)
+            cursor = comments.next_cursor
+        self.assertEqual(loaded, self.comments[PAGE_SIZE:])
+
+    def test_fallback_link_opens_next_page_on_post_detail(self):
+        '''Без JS «Показать ещё» открывает следующую страницу у поста.'''
+        cursor = self.guest.get(
+            self.POST_DETAIL_URL
+        ).context['comments'].next_cursor
+        response = self.guest.get(self.POST_DETAIL_URL, {'comments': cursor})
+        self.assertEqual(
+            list(response.context['comments']),
+            self.comments[PAGE_SIZE:PAGE_SIZE * 2],
+        )
+
+    def test_fragment_queries_do_not_depend_on_comments(self):
+        '''Авторы приходят одним JOIN: два запроса на любую страницу.'''
+        with self.assertNumQueries(2):
+            self.guest.get(self.COMMENT_LIST_URL)
+
+    def test_fragment_of_missing_post(self):
+        '''Комментарии несуществующего поста — 404.'''
+        self.assertEqual(
+            self.guest.get(
+                reverse('posts:comment_list', args=[self.post.id + 1])
+            ).status_code,
+            404,
+        )
+
+
+class CommentSubmitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.post = Post.objects.create(
+            author=cls.author_of_post, text='Тестовый пост'
+        )
+        cls.COMMENT_URL = reverse('posts:add_comment', args=[cls.post.id])
+        cls.author = Client()
+        cls.author.force_login(cls.author_of_post)
+
+    def setUp(self):
+        cache.clear()
+
+    def submit(self, text):
+        return self.author.post(
+            self.COMMENT_URL, {'text': text},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+    def test_ajax_comment_returns_fragment(self):
+        '''fetch получает HTML нового комментария вместо редиректа.'''
+        response = self.submit('Новый комментарий')
+        self.assertEqual(response.status_code, 201)
+        comment = Comment.objects.get()
+        self.assertEqual(response.json()['id'], comment.id)
+        self.assertIn('Новый комментарий', response.json()['html'])
+        self.assertIn(USERNAME, response.json()['html'])
+
+    def test_ajax_comment_errors(self):
+        '''Ошибки формы приходят JSON, комментарий не создаётся.'''
+        response = self.submit('')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+        self.assertFalse(Comment.objects.exists())
+
+    def test_form_without_js_redirects(self):
+        '''Обычная отправка формы по-прежнему ведёт на страницу поста.'''
+        self.assertRedirects(
+            self.author.post(self.COMMENT_URL, {'text': 'Комментарий'}),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
@@ -0,0 +1,112 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Like, Post, User
+
+SLUG = 'test_slug'
+USERNAME = 'test-author'
+USERNAME_2 = 'authorized_user'
+MAIN_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_list', args=[SLUG])
+PROFILE_URL = reverse('posts:profile', args=[USERNAME])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.authorized_user = User.objects.create_user(USERNAME_2)
+        cls.group = Group.objects.create(
+            description='Тестовое описание группы.',
+            slug=SLUG,
+            title='Тестовое название',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author_of_post, group=cls.group, text='Тестовый пост'
+        )
+        cls.POST_DETAIL_URL = reverse(
+            'posts:post_detail', args=[cls.post.id]
+        )
+        cls.guest = Client()
+        cls.another = Client()
+        cls.another.force_login(cls.authorized_user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_page_answers_304_without_posts_queries(self):
+        '''Повторный запрос без изменений — 304 без выборки постов.'''
+        for url in (MAIN_URL, GROUP_URL, PROFILE_URL, self.POST_DETAIL_URL):
+            with self.subTest(url=url):
+                etag = self.another.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.another.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+                # Странице поста нужен только логин автора.
+                self.assertEqual(
+                    len([q for q in queries if 'posts_' in q['sql']]),
+                    int(url == self.POST_DETAIL_URL),
+                )
+
+    def test_changes_invalidate_validators(self):
+        '''Новый комментарий меняет ETag и Last-Modified.'''
+        first = self.another.get(self.POST_DETAIL_URL)
+        Comment.objects.create(
+            post=self.post, author=self.authorized_user, text='Комментарий'
+        )
+        response = self.another.get(
+            self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=first['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Комментарий')
+
+    def test_changes_keep_other_pages_validators(self):
+        '''Лайк и комментарий не меняют ETag лент, группа — всех страниц.'''
+        other = Post.objects.create(author=self.authorized_user, text='Пост')
+        urls = (MAIN_URL, GROUP_URL, PROFILE_URL)
+        etags = [self.another.get(url)['ETag'] for url in urls]
+        Like.objects.create(
+            blog_post=other, liked_by=self.author_of_post, like=True
+        )
+        Comment.objects.create(
+            post=other, author=self.authorized_user, text='Комментарий'
+        )
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.another.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    ).status_code,
+                    HTTPStatus.NOT_MODIFIED,
+                )
+        self.group.title = 'Новое название'
+        self.group.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.another.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    ).status_code,
+                    HTTPStatus.OK,
+                )
+
+    def test_etag_depends_on_viewer(self):
+        '''У разных читателей разные ETag одной страницы.'''
+        self.assertNotEqual(
+            self.another.get(PROFILE_URL)['ETag'],
+            self.guest.get(PROFILE_URL)['ETag'],
+        )
+
+    def test_cached_guest_page_answers_304(self):
+        '''Страница из кеша гостей тоже отвечает 304.'''
+        first = self.guest.get(MAIN_URL)
+        response = self.guest.get(
+            MAIN_URL, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+
+USERNAME = 'test-reader'
+MAIN_URL = reverse('posts:index')
+FOLLOW_URL = reverse('posts:follow_index')
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(USERNAME)
+        cls.authorized = Client()
+        cls.authorized.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def add_posts(self, count):
+        for _ in range(count):
+            number = Post.objects.count()
+            author = User.objects.create_user(
+                f'author-{number}', first_name='Автор', last_name=str(number)
+            )
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(
+                author=author,
+                group=Group.objects.create(
+                    title=f'Группа {number}',
+                    slug=f'group-{number}',
+                    description='Описание',
+                ),
+                text=f'Пост {number}',
+            )
+
+    def queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_feed_cost_does_not_depend_on_posts(self):
+        '''Авторы и группы карточек не добавляют запросов на пост.'''
+        for url in (MAIN_URL, FOLLOW_URL):
+            with self.subTest(url=url):
+                self.add_posts(2)
+                few = self.queries(url)
+                self.add_posts(4)
+                self.assertEqual(self.queries(url), few)
+
+    def test_card_shows_author_and_group(self):
+        '''Карточка по-прежнему показывает автора и группу.'''
+        self.add_posts(1)
+        post = Post.objects.get()
+        response = self.authorized.get(MAIN_URL)
+        self.assertContains(response, post.author.get_full_name())
+        self.assertContains(
+            response, reverse('posts:group_list', args=[post.group.slug])
+        )
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 from http import client
@@ -30,6 +31,8 @@ SMALL_GIF_1 = (
     b'\x02\x00\x01\x00\x00\x02\x02\x0C'
     b'\x0A\x00\x3A'
 )
+# Картинки хранятся под SHA-256 содержимого.
+GIF_DIGEST = hashlib.sha256(SMALL_GIF_1).hexdigest()
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -102,7 +105,7 @@ class PostsFormTests(TestCase):
         self.assertEqual(form_data['group'], post.group.id)
         self.assertEqual(
             post.image.name,
-            f'{settings.IMAGE_PLACEMENT}{uploaded_1.name}'
+            f'{settings.IMAGE_PLACEMENT}{GIF_DIGEST[:2]}/{GIF_DIGEST}.gif'
         )
         self.assertEqual(form_data['text'], post.text)
         self.assertEqual(response.status_code, client.OK)
@@ -138,7 +141,7 @@ class PostsFormTests(TestCase):
         self.assertEqual(form_data['group'], post.group.id)
         self.assertEqual(
             post.image.name,
-            f'{settings.IMAGE_PLACEMENT}{uploaded_3.name}'
+            f'{settings.IMAGE_PLACEMENT}{GIF_DIGEST[:2]}/{GIF_DIGEST}.gif'
         )
         self.assertEqual(form_data['text'], post.text)
         self.assertRedirects(response, self.POST_DETAIL_URL)
@@ -0,0 +1,168 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .. import garbage, media, thumbnails
+from ..models import MediaFile, Post, User
+
+USERNAME = 'test-author'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF[:-3] + b'\x0B\x00\x3B'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+@mock.patch.object(media.transaction, 'on_commit', lambda func: func())
+class MediaGarbageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author_of_post,
+            text='Пост',
+            image=SimpleUploadedFile(
+                name='meme.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        self.storage = Post._meta.get_field('image').storage
+
+    def tearDown(self):
+        for folder in (settings.IMAGE_PLACEMENT, 'cache/'):
+            shutil.rmtree(
+                os.path.join(TEMP_MEDIA_ROOT, folder), ignore_errors=True
+            )
+
+    def collect(self, **options):
+        out = StringIO()
+        call_command(
+            'collect_media_garbage', min_age=0, stdout=out, **options
+        )
+        return out.getvalue()
+
+    def orphan(self):
+        return self.storage.save(
+            f'{settings.IMAGE_PLACEMENT}lost.gif', ContentFile(OTHER_GIF)
+        )
+
+    def test_orphan_original_removed(self):
+        '''Оригинал без поста удаляется, картинка поста остаётся.'''
+        name = self.orphan()
+        out = self.collect()
+        self.assertFalse(self.storage.exists(name))
+        self.assertTrue(self.storage.exists(self.post.image.name))
+        self.assertIn('Удалено оригиналов: 1, миниатюр: 0', out)
+
+    def test_image_without_counter_kept(self):
+        '''Картинка, записанная посту мимо счётчиков, не удаляется.'''
+        name = self.orphan()
+        Post.objects.filter(id=self.post.id).update(image=name)
+        MediaFile.objects.all().delete()
+        self.collect()
+        self.assertTrue(self.storage.exists(name))
+
+    def test_dry_run_keeps_files(self):
+        '''С --dry-run лишние файлы только перечисляются.'''
+        name = self.orphan()
+        out = self.collect(dry_run=True)
+        self.assertTrue(self.storage.exists(name))
+        self.assertIn(name, out)
+        self.assertIn('Найдено лишних оригиналов: 1', out)
+
+    def test_young_files_kept(self):
+        '''Свежие файлы могут принадлежать незакоммиченной загрузке.'''
+        name = self.orphan()
+        call_command('collect_media_garbage', stdout=StringIO())
+        self.assertTrue(self.storage.exists(name))
+
+    def test_thumbnails_of_dropped_image_removed(self):
+        '''Миниатюры картинки, брошенной мимо счётчиков, удаляются.'''
+        name = self.post.image.name
+        thumbnails.generate(name)
+        thumbnail = thumbnails.ready(self.post.image, 'card_960')
+        Post.objects.filter(id=self.post.id).update(image='')
+        MediaFile.objects.filter(name=name).delete()
+        out = self.collect()
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(thumbnail.exists())
+        self.assertIsNone(default.kvstore.get(thumbnail))
+        self.assertIn(
+            'Удалено оригиналов: 1, '
+            f'миниатюр: {len(settings.THUMBNAIL_SPECS)}', out
+        )
+
+    def test_live_thumbnails_kept(self):
+        '''Миниатюры картинок постов не трогаются.'''
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.ready(self.post.image, 'card_960')
+        self.collect()
+        self.assertTrue(thumbnail.exists())
+
+    def test_thumbnails_of_old_storage_removed(self):
+        '''Миниатюры, посчитанные с прежним хранилищем, удаляются.'''
+        geometry, options = settings.THUMBNAIL_SPECS['card_960']
+        legacy = get_thumbnail(
+            ImageFile(self.post.image.name, FileSystemStorage()),
+            geometry, **options
+        )
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.ready(self.post.image, 'card_960')
+        self.collect()
+        self.assertFalse(legacy.exists())
+        self.assertTrue(thumbnail.exists())
+        self.assertTrue(self.storage.exists(self.post.image.name))
+
+    def test_unknown_thumbnail_file_removed(self):
+        '''Файл миниатюры, забытый хранилищем ключей sorl, удаляется.'''
+        name = default.storage.save('cache/ab/cd/lost.jpg', ContentFile(b'x'))
+        out = self.collect()
+        self.assertFalse(default.storage.exists(name))
+        self.assertIn('миниатюр: 1', out)
+
+    def test_rate_limits_removals(self):
+        '''--rate растягивает удаления во времени.'''
+        self.orphan()
+        default.storage.save('cache/ab/cd/lost.jpg', ContentFile(b'x'))
+        with mock.patch.object(garbage.time, 'sleep') as sleep:
+            self.collect(rate=1)
+        sleep.assert_called_once()
+
+    def test_rate_paces_batches_of_thumbnails(self):
+        '''Миниатюры исходника удаляются пачкой, пауза — между пачками.'''
+        name = self.post.image.name
+        thumbnails.generate(name)
+        Post.objects.filter(id=self.post.id).update(image='')
+        MediaFile.objects.filter(name=name).delete()
+        with mock.patch.object(garbage.time, 'sleep') as sleep:
+            self.collect(rate=1)
+        sleep.assert_called_once()
+        self.assertGreater(
+            sleep.call_args[0][0], len(settings.THUMBNAIL_SPECS) - 1
+        )
@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post, User
+
+USERNAME = 'test-author'
+NEW_POST_URL = reverse('posts:post_create')
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+PLACEMENT = settings.IMAGE_PLACEMENT
+
+
+def stored_name(post, extension):
+    """Имя в хранилище: SHA-256 сохранённого содержимого."""
+    digest = post.image_hash
+    return f'{PLACEMENT}{digest[:2]}/{digest}.{extension}'
+
+
+def upload(name, size, image_format, mode='RGB', **params):
+    content = BytesIO()
+    Image.new(mode, size, 'teal').save(content, image_format, **params)
+    return SimpleUploadedFile(name=name, content=content.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=600)
+class UploadNormalizationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.author = Client()
+        cls.author.force_login(cls.author_of_post)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, image):
+        self.author.post(NEW_POST_URL, {'text': image.name, 'image': image})
+        post = Post.objects.get(text=image.name)
+        return post, Image.open(post.image.path)
+
+    def test_photo_rotated_downscaled_and_stripped(self):
+        '''Фото поворачивается по EXIF, уменьшается и теряет EXIF.'''
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        post, image = self.create(
+            upload('photo.jpg', (1800, 900), 'JPEG', exif=exif)
+        )
+        self.assertEqual(post.image.name, stored_name(post, 'webp'))
+        self.assertEqual(image.format, 'WEBP')
+        self.assertEqual(image.size, (300, 600))
+        self.assertNotIn(ORIENTATION, image.getexif())
+
+    @override_settings(IMAGE_FORMAT='JPEG')
+    def test_jpeg_fallback_flattens_transparency(self):
+        '''В JPEG прозрачность ложится на белый фон.'''
+        post, image = self.create(
+            upload('logo.png', (100, 50), 'PNG', mode='RGBA')
+        )
+        self.assertEqual(post.image.name, stored_name(post, 'jpg'))
+        self.assertEqual((image.format, image.mode), ('JPEG', 'RGB'))
+        self.assertEqual(image.size, (100, 50))
+
+    def test_gif_kept_as_is(self):
+        '''GIF не пересжимается: анимация сохраняется.'''
+        post, image = self.create(upload('anim.gif', (40, 40), 'GIF'))
+        self.assertEqual(post.image.name, stored_name(post, 'gif'))
+        self.assertEqual(image.format, 'GIF')
+
+    def test_metadata_stored_on_upload(self):
+        '''Размеры, цвет и хеш картинки сохраняются при загрузке.'''
+        post, image = self.create(upload('meta.png', (800, 400), 'PNG'))
+        self.assertEqual((post.image_width, post.image_height), (600, 300))
+        self.assertEqual(post.image_color, '#008080')
+        self.assertEqual(len(post.image_hash), 64)
+        post.image = None
+        post.save()
+        self.assertEqual(
+            (post.image_width, post.image_color, post.image_hash),
+            (None, '', '')
+        )
+
+    def test_fill_image_metadata_command(self):
+        '''fill_image_metadata заполняет поля старых постов.'''
+        post, _ = self.create(upload('old.png', (80, 40), 'PNG'))
+        Post.objects.update(image_width=None, image_hash='')
+        Post.objects.create(
+            author=self.author_of_post, text='Без файла', image='posts/no.png'
+        )
+        out = StringIO()
+        call_command('fill_image_metadata', batch_size=1, stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(post.image_width, 80)
+        self.assertIn('файлов не найдено: 1', out.getvalue())
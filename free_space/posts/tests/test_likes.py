@@ -0,0 +1,285 @@
+import re
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..forms import PostForm
+from ..likes import PageLikes, like_count_subquery
+from ..management.commands import recount_likes
+from ..models import Like, LikeCounterShard, Post, User
+
+USERNAME = 'test-author'
+USERNAME_2 = 'authorized_user'
+MAIN_URL = reverse('posts:index')
+LIKE_STATES_URL = reverse('posts:like_states')
+ADD_URL = reverse('posts:add')
+REMOVE_URL = reverse('posts:remove')
+TOGGLE_URL = reverse('posts:like_toggle')
+LOGIN_URL = reverse('users:login')
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="(\w+)"')
+
+
+class PageLikesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.authorized_user = User.objects.create_user(USERNAME_2)
+        cls.posts = [
+            Post.objects.create(author=cls.author_of_post, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        cls.like = Like.objects.create(
+            blog_post=cls.posts[0], liked_by=cls.authorized_user, like=True
+        )
+        Like.objects.create(
+            blog_post=cls.posts[0], liked_by=cls.author_of_post, like=True
+        )
+        cls.another = Client()
+        cls.another.force_login(cls.authorized_user)
+
+    def test_page_states_in_one_query(self):
+        '''Счётчики берутся из постов, отметки читателя — один запрос.'''
+        posts = list(Post.objects.order_by('id'))
+        page_likes = PageLikes(posts, self.authorized_user)
+        with self.assertNumQueries(1):
+            states = [page_likes.state(post.id) for post in posts]
+        self.assertEqual(states[0], {
+            'count': 2, 'liked': True, 'like_id': self.like.id
+        })
+        self.assertEqual(states[1], {
+            'count': 0, 'liked': False, 'like_id': None
+        })
+
+    def test_anonymous_needs_no_queries(self):
+        '''Для гостя состояние лайков не требует запросов.'''
+        page_likes = PageLikes(self.posts, AnonymousUser())
+        with self.assertNumQueries(0):
+            self.assertFalse(page_likes.state(self.posts[0].id)['liked'])
+
+    def test_feed_renders_public_like_buttons(self):
+        '''Кнопки лайков в ленте одинаковы для всех, кроме CSRF-токена.'''
+        cache.clear()
+        response = self.another.get(MAIN_URL)
+        self.assertContains(response, "<span class='likes-qty'>2</span>")
+        self.assertNotContains(response, 'blog_likes_id')
+        self.assertEqual(
+            CSRF_INPUT.sub('', response.content.decode()),
+            CSRF_INPUT.sub('', self.another.get(MAIN_URL).content.decode()),
+        )
+
+    def test_like_form_works_without_js(self):
+        '''Форма лайка несёт токен читателя и работает без JS.'''
+        reader = Client(enforce_csrf_checks=True)
+        reader.force_login(self.authorized_user)
+        token = CSRF_INPUT.search(reader.get(MAIN_URL).content.decode())
+        response = reader.post(ADD_URL, {
+            'csrfmiddlewaretoken': token.group(1),
+            'blog_post_id': self.posts[2].id,
+            'url_from': MAIN_URL,
+        })
+        self.assertRedirects(response, MAIN_URL)
+        self.assertTrue(Like.objects.filter(blog_post=self.posts[2]).exists())
+
+    def test_guest_like_form_leads_to_login(self):
+        '''Гостю форма лайка ведёт на вход и не ставит CSRF-cookie.'''
+        response = Client().get(MAIN_URL)
+        self.assertContains(response, f"action='{LOGIN_URL}' method='get'")
+        self.assertNotRegex(response.content.decode(), CSRF_INPUT)
+        self.assertFalse(response.cookies)
+
+    def test_guest_page_skips_like_states(self):
+        '''Гостю не подключается скрипт, спрашивающий like_states.'''
+        self.assertNotContains(Client().get(MAIN_URL), LIKE_STATES_URL)
+        self.assertContains(self.another.get(MAIN_URL), LIKE_STATES_URL)
+
+    def test_like_states_endpoint(self):
+        '''like_states отдаёт личные отметки читателя.'''
+        ids = ','.join(str(post.id) for post in self.posts)
+        data = self.another.get(LIKE_STATES_URL, {'ids': ids}).json()
+        self.assertEqual(data['posts'][str(self.posts[0].id)], {
+            'count': 2, 'liked': True, 'like_id': self.like.id
+        })
+        self.assertFalse(data['posts'][str(self.posts[1].id)]['liked'])
+        guest = Client().get(LIKE_STATES_URL, {'ids': ids}).json()
+        self.assertFalse(guest['posts'][str(self.posts[0].id)]['liked'])
+
+    def test_like_views_use_request_user(self):
+        '''Лайк ставится и снимается только от имени вошедшего.'''
+        post = self.posts[2]
+        self.another.post(ADD_URL, {
+            'blog_post_id': post.id,
+            'user_id': self.author_of_post.id,
+            'url_from': MAIN_URL,
+        })
+        like = Like.objects.get(blog_post=post)
+        self.assertEqual(like.liked_by, self.authorized_user)
+        author = Client()
+        author.force_login(self.author_of_post)
+        author.post(REMOVE_URL, {
+            'blog_likes_id': like.id, 'url_from': MAIN_URL
+        })
+        self.assertTrue(Like.objects.filter(id=like.id).exists())
+        self.another.post(REMOVE_URL, {
+            'blog_likes_id': like.id, 'url_from': MAIN_URL
+        })
+        self.assertFalse(Like.objects.filter(id=like.id).exists())
+
+    def test_like_views_redirect_only_to_own_site(self):
+        '''Формы лайков не уводят на чужой url_from.'''
+        post = self.posts[2]
+        response = self.another.post(ADD_URL, {
+            'blog_post_id': post.id, 'url_from': 'https://evil.example/'
+        })
+        self.assertRedirects(response, MAIN_URL)
+        response = self.another.post(REMOVE_URL, {
+            'blog_likes_id': Like.objects.get(blog_post=post).id,
+            'url_from': '//evil.example/',
+        })
+        self.assertRedirects(response, MAIN_URL)
+
+    def test_toggle_like(self):
+        '''Переключатель ставит и снимает лайк, отвечая JSON.'''
+        post = self.posts[1]
+        liked = self.another.post(TOGGLE_URL, {'blog_post_id': post.id})
+        like = Like.objects.get(blog_post=post)
+        self.assertEqual(liked.json(), {
+            'count': 1, 'liked': True, 'like_id': like.id
+        })
+        self.assertEqual(like.liked_by, self.authorized_user)
+        self.assertEqual(
+            self.another.post(TOGGLE_URL, {'blog_post_id': post.id}).json(),
+            {'count': 0, 'liked': False, 'like_id': None}
+        )
+        self.assertFalse(Like.objects.filter(blog_post=post).exists())
+
+    def test_toggle_writes_without_rereading(self):
+        '''Переключение — запрос поста, лайка и одна запись со счётчиком.'''
+        post = self.posts[1]
+        for liked, count in ((True, 1), (False, 0)):
+            with self.subTest(liked=liked):
+                with CaptureQueriesContext(connection) as context:
+                    state = self.another.post(
+                        TOGGLE_URL, {'blog_post_id': post.id}
+                    ).json()
+                self.assertEqual(state['liked'], liked)
+                self.assertEqual(state['count'], count)
+                self.assertEqual(
+                    len([q for q in context if 'posts_' in q['sql']]), 4
+                )
+
+    def test_toggle_with_state_is_idempotent(self):
+        '''Повтор запроса с liked=1 или liked=0 ничего не меняет.'''
+        post = self.posts[1]
+        for _ in range(2):
+            state = self.another.post(
+                TOGGLE_URL, {'blog_post_id': post.id, 'liked': '1'}
+            ).json()
+        self.assertEqual(state['count'], 1)
+        self.assertEqual(Like.objects.filter(blog_post=post).count(), 1)
+        for _ in range(2):
+            state = self.another.post(
+                TOGGLE_URL, {'blog_post_id': post.id, 'liked': '0'}
+            ).json()
+        self.assertEqual(state['count'], 0)
+        self.assertFalse(Like.objects.filter(blog_post=post).exists())
+
+    def test_toggle_needs_login(self):
+        '''Гость не может поставить лайк.'''
+        response = Client().post(
+            TOGGLE_URL, {'blog_post_id': self.posts[1].id}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Like.objects.filter(blog_post=self.posts[1]).exists())
+
+    def test_one_like_per_reader(self):
+        '''Вторую строку лайка той же пары не пропустит база.'''
+        with self.assertRaises(IntegrityError):
+            Like.objects.create(
+                blog_post=self.posts[0],
+                liked_by=self.authorized_user,
+                like=True,
+            )
+
+    def test_like_count_follows_like_rows(self):
+        '''Создание и удаление лайка сдвигает Post.like_count.'''
+        post = self.posts[1]
+        like = Like.objects.create(
+            blog_post=post, liked_by=self.authorized_user, like=True
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        like.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+
+    def test_edit_after_like_keeps_like_count(self):
+        '''Правка поста, загруженного до лайка, не сбрасывает счётчик.'''
+        post = Post.objects.get(id=self.posts[1].id)
+        self.another.post(TOGGLE_URL, {'blog_post_id': post.id})
+        PostForm({'text': 'Правка'}, instance=post).save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Правка')
+        self.assertEqual(post.like_count, 1)
+
+    @override_settings(LIKE_COUNTER_HOT=1, LIKE_COUNTER_SHARDS=4)
+    def test_hot_post_counts_in_shards(self):
+        '''Горячий пост копит лайки в шардах, итог не теряется.'''
+        post = self.posts[0]
+        for i in range(5):
+            Like.objects.create(
+                blog_post=post,
+                liked_by=User.objects.create_user(f'fan_{i}'),
+                like=True,
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 2)
+        self.assertTrue(LikeCounterShard.objects.filter(post=post).exists())
+        self.assertEqual(PageLikes([post], self.authorized_user).state(
+            post.id
+        )['count'], 7)
+
+    def test_recount_likes_repairs_drift(self):
+        '''Команда recount_likes восстанавливает счётчики по Like.'''
+        Post.objects.update(like_count=100)
+        LikeCounterShard.objects.create(post=self.posts[1], shard=0, count=5)
+        call_command('recount_likes', batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            [post.like_count for post in Post.objects.order_by('id')],
+            [2, 0, 0]
+        )
+        self.assertFalse(LikeCounterShard.objects.exists())
+
+    @override_settings(LIKE_COUNTER_HOT=1)
+    def test_recount_likes_keeps_late_shards(self):
+        '''Лайк, записанный в шард во время пересчёта, не теряется.'''
+        post = self.posts[0]
+        LikeCounterShard.objects.create(post=self.posts[1], shard=0, count=5)
+
+        def late_like():
+            Like.objects.create(
+                blog_post=post,
+                liked_by=User.objects.create_user('late_fan'),
+                like=True,
+            )
+            return like_count_subquery()
+
+        with mock.patch.object(
+            recount_likes, 'like_count_subquery', late_like
+        ):
+            call_command('recount_likes', batch_size=10, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(PageLikes([post], self.authorized_user).state(
+            post.id
+        )['count'], 3)
+        self.assertTrue(LikeCounterShard.objects.filter(post=post).exists())
+        self.assertFalse(
+            LikeCounterShard.objects.filter(post=self.posts[1]).exists()
+        )
@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from .. import images, media, thumbnails
+from ..models import MediaFile, Post, User
+from ..storage import ContentAddressedStorage
+
+USERNAME = 'test-author'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF[:-3] + b'\x0B\x00\x3B'
+
+
+def gif(name, content=SMALL_GIF):
+    return SimpleUploadedFile(
+        name=name, content=content, content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+@mock.patch.object(media.transaction, 'on_commit', lambda func: func())
+class ContentAddressedMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create(self, image):
+        return Post.objects.create(
+            author=self.author_of_post, text='Пост', image=image
+        )
+
+    def refs(self, name):
+        return MediaFile.objects.get(name=name).refs
+
+    def test_same_content_stored_once(self):
+        '''Одинаковые загрузки делят один файл и одни миниатюры.'''
+        first = self.create(gif('meme.gif'))
+        second = self.create(gif('repost.gif'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            os.listdir(os.path.dirname(first.image.path)),
+            [os.path.basename(first.image.name)]
+        )
+        self.assertEqual(self.refs(first.image.name), 2)
+        thumbnails.generate(first.image.name)
+        self.assertEqual(
+            thumbnails.ready(first.image, 'card_960').url,
+            thumbnails.ready(second.image, 'card_960').url,
+        )
+
+    def test_upload_hashed_once(self):
+        '''Метаданные, ссылка и хранилище берут один SHA-256 загрузки.'''
+        with mock.patch.object(
+            images.hashlib, 'sha256', wraps=images.hashlib.sha256
+        ) as sha256:
+            post = self.create(gif('once.gif'))
+        self.assertEqual(sha256.call_count, 1)
+        self.assertIn(post.image_hash, post.image.name)
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def test_file_removed_with_last_reference(self):
+        '''Файл и миниатюры удаляются вместе с последней ссылкой.'''
+        first = self.create(gif('meme.gif'))
+        second = self.create(gif('repost.gif'))
+        name, path = first.image.name, first.image.path
+        thumbnails.generate(name)
+        thumbnail = thumbnails.ready(first.image, 'card_960')
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.refs(name), 1)
+        second.delete()
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(thumbnail.exists())
+
+    def test_replaced_image_released(self):
+        '''Замена картинки снимает ссылку со старого файла.'''
+        post = self.create(gif('meme.gif'))
+        old_path = post.image.path
+        post.image = gif('same.gif')
+        post.save()
+        self.assertEqual(self.refs(post.image.name), 1)
+        post.image = gif('other.gif', OTHER_GIF)
+        post.save()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def test_upload_racing_last_release_keeps_file(self):
+        '''Загрузка во время удаления последней ссылки не теряет файл.'''
+        post = self.create(gif('meme.gif'))
+        name, path = post.image.name, post.image.path
+        callbacks = []
+        with mock.patch.object(
+            media.transaction, 'on_commit', callbacks.append
+        ):
+            post.delete()
+        exists = ContentAddressedStorage.exists
+
+        def exists_then_remove(storage, name):
+            # Удаление после коммита успевает между проверкой и записью.
+            found = exists(storage, name)
+            while callbacks:
+                callbacks.pop()()
+            return found
+
+        with mock.patch.object(
+            ContentAddressedStorage, 'exists', exists_then_remove
+        ):
+            repost = self.create(gif('repost.gif'))
+        self.assertEqual(repost.image.name, name)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.refs(name), 1)
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import middleware
+from ..middleware import page_keys
+from ..models import Post, User
+
+USERNAME = 'test-author'
+MAIN_URL = reverse('posts:index')
+PAGE_URI = f'http://testserver{MAIN_URL}'
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.post = Post.objects.create(
+            author=cls.author_of_post, text='Тестовый пост'
+        )
+        cls.guest = Client()
+        cls.author = Client()
+        cls.author.force_login(cls.author_of_post)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_page_served_from_cache(self):
+        '''Повторный запрос гостя обслуживается из кеша без запросов к БД.'''
+        first = self.guest.get(MAIN_URL)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.guest.get(MAIN_URL)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(first.content, second.content)
+        self.assertIn('Cookie', second['Vary'])
+
+    def test_authenticated_user_bypasses_cache(self):
+        '''Страницы вошедших пользователей не кешируются.'''
+        self.guest.get(MAIN_URL)
+        self.assertNotIn('X-Page-Cache', self.author.get(MAIN_URL))
+
+    def test_stale_copy_while_another_request_rebuilds(self):
+        '''Устаревшую запись перестраивает один запрос, другим — копия.'''
+        old = self.guest.get(MAIN_URL).content
+        Post.objects.create(author=self.author_of_post, text='Новый пост')
+        _, lock = page_keys(PAGE_URI)
+        cache.add(lock, 1)
+        stale = self.guest.get(MAIN_URL)
+        self.assertEqual(stale['X-Page-Cache'], 'stale')
+        self.assertEqual(stale.content, old)
+        cache.delete(lock)
+        rebuilt = self.guest.get(MAIN_URL)
+        self.assertEqual(rebuilt['X-Page-Cache'], 'miss')
+        self.assertContains(rebuilt, 'Новый пост')
+        self.assertIsNone(cache.get(lock))
+
+    def test_cold_miss_waits_for_rebuild(self):
+        '''Без записи запрос ждёт копию, которую строит другой.'''
+        self.guest.get(MAIN_URL)
+        key, lock = page_keys(PAGE_URI)
+        entry = cache.get(key)
+        cache.delete(key)
+        cache.add(lock, 'other')
+        with mock.patch.object(
+            middleware.time, 'sleep', lambda _: cache.set(key, entry)
+        ), self.assertNumQueries(0):
+            response = self.guest.get(MAIN_URL)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(cache.get(lock), 'other')
+
+    @override_settings(PAGE_CACHE_WAIT=0)
+    def test_foreign_lock_kept(self):
+        '''Запрос снимает только свою блокировку.'''
+        _, lock = page_keys(PAGE_URI)
+        cache.add(lock, 'other')
+        self.assertEqual(self.guest.get(MAIN_URL)['X-Page-Cache'], 'miss')
+        self.assertEqual(cache.get(lock), 'other')
+
+    @override_settings(PAGE_CACHE_TTLS={'posts:index': -1})
+    def test_expired_entry_is_rebuilt(self):
+        '''Истёкшая по TTL запись перестраивается.'''
+        self.guest.get(MAIN_URL)
+        self.assertEqual(self.guest.get(MAIN_URL)['X-Page-Cache'], 'miss')
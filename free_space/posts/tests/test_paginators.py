@@ -0,0 +1,164 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, User
+from ..paginators import (
+    CursorPaginator, EstimatedCountPaginator, encode_cursor, estimated_count,
+    page_window,
+)
+
+USERNAME = 'test-author'
+MAIN_URL = reverse('posts:index')
+POSTS_NUM = settings.NUMB_POSTS_PAGE * 2 + 3
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        Post.objects.bulk_create(
+            Post(author=cls.author_of_post, text=f'Текст поста №{i}')
+            for i in range(POSTS_NUM)
+        )
+        # bulk_create ставит почти одинаковые pub_date: порядок держит id.
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+        cls.guest = Client()
+
+    def test_pages_follow_feed_order(self):
+        '''Листание вперёд и назад повторяет порядок ленты.'''
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        pages = [paginator.cursor_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.cursor_page(pages[-1].next_cursor))
+        self.assertEqual(
+            [post for page in pages for post in page], self.expected
+        )
+        self.assertFalse(pages[0].has_previous())
+        back = paginator.cursor_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+
+    def test_page_without_count_and_offset(self):
+        '''Страница — один запрос без COUNT и OFFSET.'''
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.cursor_page(None)
+        with CaptureQueriesContext(connection) as queries:
+            paginator.cursor_page(first.next_cursor)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_broken_cursor_gives_first_page(self):
+        '''Испорченный курсор открывает первую страницу.'''
+        cases = ['мусор', 'bm90LWpzb24', encode_cursor('n', ['x', 'y'])]
+        for cursor in cases:
+            with self.subTest(cursor=cursor):
+                response = self.guest.get(MAIN_URL, {'cursor': cursor})
+                self.assertEqual(
+                    list(response.context['page_obj']),
+                    self.expected[:settings.NUMB_POSTS_PAGE]
+                )
+
+    def test_legacy_page_links(self):
+        '''Ссылки ?page= продолжают работать.'''
+        response = self.guest.get(MAIN_URL, {'page': 3})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.expected[settings.NUMB_POSTS_PAGE * 2:]
+        )
+
+
+class EstimatedCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        Post.objects.bulk_create(
+            Post(author=cls.author_of_post, text=f'Текст поста №{i}')
+            for i in range(POSTS_NUM)
+        )
+        cls.admin = Client()
+        cls.admin.force_login(User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        ))
+
+    def test_small_tables_counted_exactly(self):
+        '''Ниже порога — точный COUNT(*).'''
+        self.assertEqual(estimated_count(Post.objects.all()), POSTS_NUM)
+        self.assertEqual(
+            estimated_count(Post.objects.filter(text__endswith='№1')), 1
+        )
+        self.assertEqual(estimated_count(Post.objects.none()), 0)
+
+    @skipUnless(connection.vendor == 'postgresql', 'оценки есть в Postgres')
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=1)
+    def test_huge_tables_use_planner_estimate(self):
+        '''Выше порога таблица без условий оценивается, выборка — считается.'''
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Post._meta.db_table}')
+        with CaptureQueriesContext(connection) as queries:
+            estimate = estimated_count(Post.objects.all())
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertEqual(estimate, POSTS_NUM)
+        with CaptureQueriesContext(connection) as queries:
+            count = estimated_count(Post.objects.filter(text__endswith='№1'))
+        self.assertEqual(count, 1)
+        self.assertEqual(len(queries), 1)
+
+    def test_legacy_pages_use_estimated_count(self):
+        '''Страницы ?page= считают посты через estimated_count.'''
+        response = Client().get(MAIN_URL, {'page': 2})
+        paginator = response.context['page_obj'].paginator
+        self.assertIsInstance(paginator, EstimatedCountPaginator)
+        self.assertEqual(paginator.count, POSTS_NUM)
+
+    def test_admin_changelists_use_estimated_count(self):
+        '''Списки постов, комментариев и лайков в админке без COUNT(*).'''
+        for model in ('post', 'comment', 'like'):
+            with self.subTest(model=model):
+                cl = self.admin.get(
+                    reverse(f'admin:posts_{model}_changelist'), {'q': '№1'}
+                ).context['cl']
+                self.assertIsInstance(cl.paginator, EstimatedCountPaginator)
+                self.assertTrue(cl.show_full_result_count)
+        self.assertEqual(cl.full_result_count, 0)
+        cl = self.admin.get(
+            reverse('admin:posts_post_changelist'), {'q': '№1'}
+        ).context['cl']
+        self.assertEqual(cl.full_result_count, POSTS_NUM)
+        self.assertEqual(
+            cl.result_count, Post.objects.filter(text__contains='№1').count()
+        )
+
+
+class PageWindowTests(TestCase):
+    def test_window_keeps_ends_and_neighbours(self):
+        '''Окно: края, по две страницы вокруг текущей и пропуски.'''
+        self.assertEqual(page_window(1, 1), (1,))
+        self.assertEqual(page_window(3, 7), (1, 2, 3, 4, 5, 6, 7))
+        self.assertEqual(
+            page_window(25, 50), (1, None, 23, 24, 25, 26, 27, None, 50)
+        )
+        self.assertEqual(page_window(50, 50), (1, None, 48, 49, 50))
+        # Пропуск в одну страницу показывается номером, а не «…».
+        self.assertEqual(
+            page_window(5, 50), (1, 2, 3, 4, 5, 6, 7, None, 50)
+        )
+
+    @override_settings(NUMB_POSTS_PAGE=1)
+    def test_paginator_size_does_not_grow_with_pages(self):
+        '''Число ссылок на страницы не растёт с числом страниц.'''
+        author = User.objects.create_user(USERNAME)
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Текст поста №{i}')
+            for i in range(POSTS_NUM)
+        )
+        response = Client().get(MAIN_URL, {'page': POSTS_NUM // 2})
+        self.assertContains(response, '&hellip;', count=2)
+        self.assertNotContains(response, f'?page={POSTS_NUM // 2 + 3}"')
+        self.assertContains(response, f'?page={POSTS_NUM}"')
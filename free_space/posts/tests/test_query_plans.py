@@ -0,0 +1,203 @@
+import re
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Follow, Group, Post, User
+
+USERNAME = 'test-reader'
+SLUG = 'test_slug'
+AUTHORS = 3
+POSTS = 60
+EXPLAIN = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+FULL_SCAN = {
+    'sqlite': re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$', re.M),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+# Граница по ключу курсора: страница начинается с позиции в индексе,
+# а не читает его с начала.
+BOUND = {
+    'sqlite': r'USING (?:COVERING )?INDEX \w+ \([^)]*\b{key}{op}',
+    'postgresql': r'Index Cond: .*\b{key} {op}',
+}
+SORT = {
+    'sqlite': re.compile(r'USE TEMP B-TREE'),
+    'postgresql': re.compile(r'(?:^|->)\s*(?:Incremental )?Sort\b', re.M),
+}
+
+
+class QueryPlanTests(TestCase):
+    '''Запросы лент идут по индексам: без полного просмотра и сортировки.
+
+    Каждый запрос страницы с ORDER BY прогоняется через EXPLAIN.
+    В Postgres на маленькой базе перебор дешевле индекса, поэтому
+    seqscan и sort выключены: план с ними значит, что индекса нет.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(USERNAME)
+        cls.authors = [
+            User.objects.create_user(f'author-{number}')
+            for number in range(AUTHORS)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug=SLUG, description='Описание'
+        )
+        for author in cls.authors[1:]:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = [
+            Post.objects.create(
+                author=cls.authors[number % AUTHORS],
+                group=cls.group if number % 2 else None,
+                text=f'Пост {number}',
+            )
+            for number in range(POSTS)
+        ][-1]
+        # Индекс поиска пишется после коммита, которого в TestCase нет.
+        search.reindex(Post.objects.all())
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.reader, text='Комментарий')
+            for _ in range(POSTS)
+        )
+        cls.authorized = Client()
+        cls.authorized.force_login(cls.reader)
+        cls.admin = Client()
+        cls.admin.force_login(User.objects.create_superuser(
+            'test-admin', 'admin@example.com', 'password'
+        ))
+
+    def setUp(self):
+        cache.clear()
+        if connection.vendor not in EXPLAIN:
+            self.skipTest(f'Нет разбора планов для {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+
+    def plans(self, url, client=None):
+        client = client or self.authorized
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(client.get(url).status_code, 200)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and 'ORDER BY' in query['sql']
+            and not query['sql'].startswith('SELECT DISTINCT')
+        ]
+        self.assertTrue(queries)
+        with connection.cursor() as cursor:
+            for sql in queries:
+                cursor.execute(EXPLAIN[connection.vendor] + sql)
+                yield sql, '\n'.join(
+                    str(row[-1]) for row in cursor.fetchall()
+                )
+
+    def assertIndexed(self, url, allow_sort=False, client=None):
+        for sql, plan in self.plans(url, client):
+            with self.subTest(url=url, sql=sql):
+                self.assertFalse(
+                    FULL_SCAN[connection.vendor].findall(plan), plan
+                )
+                if not allow_sort:
+                    self.assertFalse(
+                        SORT[connection.vendor].search(plan), plan
+                    )
+
+    def assertBounded(self, url, key, op='[<>]', allow_sort=False):
+        self.assertIndexed(url, allow_sort)
+        pattern = BOUND[connection.vendor].format(key=key, op=op)
+        plans = [plan for _, plan in self.plans(url)]
+        self.assertTrue(
+            any(re.search(pattern, plan) for plan in plans), plans
+        )
+
+    def next_page(self, url, params=None, page='page_obj'):
+        params = params or {}
+        cursor = self.authorized.get(url, params).context[page].next_cursor
+        self.assertTrue(cursor)
+        return f'{url}?{urlencode({**params, "cursor": cursor})}'
+
+    def test_feeds_use_indexes(self):
+        '''Главная, группа и профиль листаются по составным индексам.'''
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[SLUG]),
+            reverse('posts:profile', args=[self.authors[0].username]),
+        ):
+            self.assertIndexed(url)
+
+    def test_feed_cursor_pages_seek_in_index(self):
+        '''Дальние страницы лент начинаются с позиции курсора в индексе.'''
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[SLUG]),
+            reverse('posts:profile', args=[self.authors[0].username]),
+        ):
+            self.assertBounded(self.next_page(url), 'pub_date')
+
+    def test_comment_cursor_pages_seek_in_index(self):
+        '''Следующие комментарии читаются от курсора по индексу.'''
+        comments = self.authorized.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        ).context['comments']
+        self.assertBounded(
+            reverse('posts:comment_list', args=[self.post.id])
+            + f'?cursor={comments.next_cursor}',
+            'created',
+        )
+
+    def test_search_cursor_pages_use_term_index(self):
+        '''Поиск берёт слова запроса из индекса и на дальних страницах.
+
+        Ранг считается по найденным строкам, поэтому сортировка по нему
+        допустима; полного просмотра таблиц быть не должно.
+        '''
+        self.assertBounded(
+            self.next_page(reverse('posts:search'), {'q': 'пост'}),
+            'term' if connection.vendor == 'sqlite' else 'vector',
+            op='[=@]', allow_sort=True,
+        )
+
+    def test_comments_use_index(self):
+        '''Комментарии поста читаются по индексу (post, created, id).'''
+        self.assertIndexed(reverse('posts:post_detail', args=[self.post.id]))
+        self.assertIndexed(reverse('posts:comment_list', args=[self.post.id]))
+
+    def test_follow_feed_uses_indexes(self):
+        '''Лента подписок находит посты по индексам.
+
+        Сортировка здесь допустима: в ней не больше TIMELINE_LENGTH
+        записей ленты и постов популярных авторов.
+        '''
+        self.assertIndexed(reverse('posts:follow_index'), allow_sort=True)
+
+    def test_admin_lists_use_indexes(self):
+        '''Списки комментариев и лайков в админке идут по индексу даты.
+
+        Дни date_hierarchy (SELECT DISTINCT) не проверяются: их
+        сортировка — это сортировка самих дней, а не строк таблицы.
+        '''
+        for model in ('comment', 'like'):
+            self.assertIndexed(
+                reverse(f'admin:posts_{model}_changelist'), client=self.admin
+            )
+
+    def test_posts_by_image_use_index(self):
+        '''Посты картинки (generate, сдвиг modified) ищутся по индексу.'''
+        sql, params = Post.objects.filter(
+            image='posts/photo.webp'
+        ).values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(EXPLAIN[connection.vendor] + sql, params)
+            plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertFalse(FULL_SCAN[connection.vendor].findall(plan), plan)
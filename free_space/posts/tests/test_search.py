@@ -0,0 +1,155 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Group, Post, SearchTerm, User
+
+SLUG = 'test_slug'
+USERNAME = 'test-author'
+SEARCH_URL = reverse('posts:search')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.group = Group.objects.create(
+            description='Тестовое описание группы.',
+            slug=SLUG,
+            title='Кошки',
+        )
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(
+            search.transaction, 'on_commit', lambda func: func()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.post = Post.objects.create(
+            author=self.author_of_post, text='Рыжий кот спит на диване'
+        )
+
+    def found(self, query):
+        return list(search.search(query))
+
+    def test_post_indexed_on_save_and_removed_on_delete(self):
+        '''Пост попадает в индекс при записи и уходит при удалении.'''
+        self.assertEqual(self.found('рыжий кот'), [self.post])
+        self.assertEqual(self.found('рыжий пёс'), [])
+        self.post.text = 'Рыжий пёс'
+        self.post.save()
+        self.assertEqual(self.found('пес'), [self.post])
+        self.post.delete()
+        self.assertEqual(self.found('пес'), [])
+        self.assertFalse(SearchTerm.objects.exists())
+
+    def test_comments_and_group_title_indexed(self):
+        '''В индексе тексты комментариев и название группы.'''
+        comment = Comment.objects.create(
+            post=self.post, author=self.author_of_post, text='Мурлычет'
+        )
+        self.assertEqual(self.found('мурлычет'), [self.post])
+        comment.delete()
+        self.assertEqual(self.found('мурлычет'), [])
+        self.post.group = self.group
+        self.post.save()
+        self.group.title = 'Коты и кошки'
+        self.group.save()
+        self.assertEqual(self.found('коты'), [self.post])
+
+    def weights(self):
+        return {
+            term: round(weight, 6) for term, weight
+            in SearchTerm.objects.filter(
+                post=self.post
+            ).values_list('term', 'weight')
+        }
+
+    def test_comment_changes_only_its_terms(self):
+        '''Комментарий правит только свои слова, как полная переиндексация.'''
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author_of_post, text='Кот')
+            for _ in range(20)
+        )
+        search.index([self.post.id])
+        with CaptureQueriesContext(connection) as queries:
+            comment = Comment.objects.create(
+                post=self.post, author=self.author_of_post,
+                text='Кот ест, кот спит',
+            )
+        self.assertFalse([
+            query for query in queries
+            if 'FROM "posts_comment"' in query['sql']
+        ])
+        incremental = self.weights()
+        search.index([self.post.id])
+        self.assertEqual(incremental, self.weights())
+        comment.delete()
+        incremental = self.weights()
+        search.index([self.post.id])
+        self.assertEqual(incremental, self.weights())
+        self.assertNotIn('ест', incremental)
+
+    def test_index_updated_after_commit(self):
+        '''Комментарий индексируется после коммита, группа — по названию.'''
+        group = Group.objects.get(id=self.group.id)
+        self.post.group = group
+        self.post.save()
+        callbacks = []
+        with mock.patch.object(
+            search.transaction, 'on_commit', callbacks.append
+        ):
+            Comment.objects.create(
+                post=self.post, author=self.author_of_post, text='Мурлычет'
+            )
+            self.assertEqual(self.found('мурлычет'), [])
+            group.description = 'Новое описание'
+            group.save()
+            self.assertEqual(len(callbacks), 1)
+            group.title = 'Коты'
+            group.save()
+        self.assertEqual(len(callbacks), 2)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.found('мурлычет коты'), [self.post])
+
+    def test_results_ranked_and_paged_by_cursor(self):
+        '''Выдача упорядочена по рангу и листается курсором.'''
+        posts = [
+            Post.objects.create(
+                author=self.author_of_post, text='кот ' * times + 'диван'
+            )
+            for times in range(1, 13)
+        ]
+        first = self.guest.get(SEARCH_URL, {'q': 'кот'})
+        second = self.guest.get(SEARCH_URL, {
+            'q': 'кот', 'cursor': first.context['page_obj'].next_cursor
+        })
+        results = (
+            list(first.context['page_obj'])
+            + list(second.context['page_obj'])
+        )
+        self.assertEqual(results[:len(posts)], posts[::-1])
+        self.assertEqual(results[-1], self.post)
+        self.assertContains(first, 'q=%D0%BA%D0%BE%D1%82&cursor=')
+
+    def test_empty_query_finds_nothing(self):
+        '''Пустой запрос — пустая страница поиска.'''
+        response = self.guest.get(SEARCH_URL, {'q': '  '})
+        self.assertEqual(list(response.context['page_obj']), [])
+
+    def test_rebuild_command_restores_index(self):
+        '''rebuild_search_index восстанавливает индекс с нуля.'''
+        SearchTerm.objects.all().delete()
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.found('диване'), [self.post])
@@ -0,0 +1,102 @@
+from io import StringIO
+from unittest import mock
+
+from django.db import connection
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import stats
+from ..models import AuthorStats, Comment, Follow, Post, User
+
+USERNAME = 'test-author'
+USERNAME_2 = 'authorized_user'
+PROFILE_URL = reverse('posts:profile', args=[USERNAME])
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.authorized_user = User.objects.create_user(USERNAME_2)
+        cls.post = Post.objects.create(
+            author=cls.author_of_post, text='Тестовый пост'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.author_of_post, text='Комментарий'
+        )
+        Follow.objects.create(
+            user=cls.authorized_user, author=cls.author_of_post
+        )
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self):
+        return self.guest.get(PROFILE_URL).context['stats']
+
+    def test_profile_stats_built_on_first_view(self):
+        '''Статистика собирается при первом просмотре профиля.'''
+        self.assertFalse(AuthorStats.objects.exists())
+        stats = self.stats()
+        self.assertEqual(
+            (stats.posts_count, stats.following_count,
+             stats.followers_count, stats.comments_count),
+            (1, 0, 1, 1)
+        )
+
+    def test_writes_keep_stats_current(self):
+        '''Посты, комментарии и подписки обновляют счётчики.'''
+        self.stats()
+        Post.objects.create(author=self.author_of_post, text='Ещё пост')
+        Comment.objects.create(
+            post=self.post, author=self.author_of_post, text='Ещё'
+        )
+        Follow.objects.filter(user=self.authorized_user).delete()
+        Follow.objects.create(
+            user=self.author_of_post, author=self.authorized_user
+        )
+        stats = self.stats()
+        self.assertEqual(
+            (stats.posts_count, stats.following_count,
+             stats.followers_count, stats.comments_count),
+            (2, 1, 0, 2)
+        )
+
+    def test_profile_header_is_one_lookup(self):
+        '''Шапка профиля не считает COUNT по связанным таблицам.'''
+        self.stats()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest.get(PROFILE_URL)
+        self.assertContains(response, 'Подписчиков: 1')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT', query['sql'])
+
+    def test_row_created_before_counting(self):
+        '''Сдвиги во время первого подсчёта находят строку счётчиков.'''
+        counts = stats.counts
+
+        def counts_with_write(author_id):
+            self.assertTrue(
+                AuthorStats.objects.filter(author_id=author_id).exists()
+            )
+            return counts(author_id)
+
+        with mock.patch.object(stats, 'counts', counts_with_write):
+            self.assertEqual(self.stats().posts_count, 1)
+
+    def test_recount_stats_repairs_drift(self):
+        '''Команда recount_stats восстанавливает счётчики профилей.'''
+        self.stats()
+        AuthorStats.objects.update(posts_count=100, followers_count=-3)
+        call_command('recount_stats', batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.values_list(
+                'posts_count', 'followers_count'
+            ).get(author=self.author_of_post),
+            (1, 1),
+        )
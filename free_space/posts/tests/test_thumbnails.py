@@ -0,0 +1,133 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail.models import KVStore
+
+from .. import thumbnails
+from ..models import Post, User
+
+USERNAME = 'test-author'
+MAIN_URL = reverse('posts:index')
+NEW_POST_URL = reverse('posts:post_create')
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def photo(name='photo.jpg'):
+    content = BytesIO()
+    Image.new('RGB', (1200, 800), 'teal').save(content, 'JPEG')
+    return SimpleUploadedFile(
+        name=name, content=content.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.author = Client()
+        cls.author.force_login(cls.author_of_post)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author_of_post, text='Пост', image=photo()
+        )
+        self.POST_DETAIL_URL = reverse(
+            'posts:post_detail', args=[self.post.id]
+        )
+
+    def test_render_never_generates_thumbnails(self):
+        '''Без готовой миниатюры страница показывает оригинал.'''
+        response = self.author.get(self.POST_DETAIL_URL)
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        self.assertFalse(KVStore.objects.exists())
+
+    def test_generated_thumbnail_used_by_templates(self):
+        '''После генерации шаблоны берут готовую миниатюру.'''
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.ready(self.post.image, 'card_960')
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        response = self.author.get(self.POST_DETAIL_URL)
+        self.assertContains(response, f'src="{thumbnail.url}"')
+
+    def test_feed_card_has_srcset_and_lazy_loading(self):
+        '''Карточка в ленте: srcset по ширинам, размеры и lazy.'''
+        thumbnails.generate(self.post.image.name)
+        response = self.author.get(MAIN_URL)
+        for width in settings.CARD_IMAGE_WIDTHS:
+            with self.subTest(width=width):
+                thumbnail = thumbnails.ready(
+                    self.post.image, f'card_{width}'
+                )
+                # Оригинал шириной 1200: вариант 1920 был бы апскейлом.
+                srcset_item = f'{thumbnail.url} {width}w'
+                if width <= self.post.image_width:
+                    self.assertContains(response, srcset_item)
+                else:
+                    self.assertNotContains(response, srcset_item)
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertTrue(self.post.image_color)
+        self.assertContains(
+            response, f'background-color: {self.post.image_color}'
+        )
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(
+            self.author.get(self.POST_DETAIL_URL), 'loading="lazy"'
+        )
+
+    def test_post_create_queues_every_spec(self):
+        '''post_create после коммита создаёт миниатюры всех размеров.'''
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda func: func()
+        ):
+            self.author.post(NEW_POST_URL, {
+                'text': 'Новый пост', 'image': photo('new.jpg')
+            })
+        post = Post.objects.get(text='Новый пост')
+        for spec in settings.THUMBNAIL_SPECS:
+            with self.subTest(spec=spec):
+                self.assertIsNotNone(thumbnails.ready(post.image, spec))
+
+    def test_generate_thumbnails_backfills_old_posts(self):
+        '''generate_thumbnails создаёт миниатюры, которых ещё нет.'''
+        Post.objects.create(
+            author=self.author_of_post, text='Без файла',
+            image='posts/missing.jpg',
+        )
+        output = StringIO()
+        call_command('generate_thumbnails', batch_size=1, stdout=output)
+        self.assertIn(
+            'Созданы миниатюры картинок: 1, уже были готовы: 0, '
+            'файлов не найдено: 1',
+            output.getvalue(),
+        )
+        self.assertTrue(thumbnails.complete(self.post.image))
+        call_command('generate_thumbnails', stdout=output)
+        self.assertIn('уже были готовы: 1', output.getvalue())
+
+    def test_pool_needs_shared_cache(self):
+        '''Пул миниатюр с LocMem в кеше shared — предупреждение check.'''
+        self.assertFalse(thumbnails.check_shared_cache(None))
+        with override_settings(THUMBNAIL_WORKERS=2):
+            self.assertEqual(
+                [warning.id for warning in thumbnails.check_shared_cache(
+                    None
+                )],
+                ['posts.W001'],
+            )
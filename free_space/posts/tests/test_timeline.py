@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import signals
+from ..models import Follow, Post, TimelineEntry, User
+
+USERNAME = 'test-author'
+USERNAME_2 = 'authorized_user'
+USERNAME_3 = 'another_reader'
+FOLLOW_URL = reverse('posts:follow_index')
+PROFILE_FOLLOW = reverse('posts:profile_follow', args=[USERNAME])
+PROFILE_UNFOLLOW = reverse('posts:profile_unfollow', args=[USERNAME])
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_of_post = User.objects.create_user(USERNAME)
+        cls.reader = User.objects.create_user(USERNAME_2)
+        cls.reader_2 = User.objects.create_user(USERNAME_3)
+        cls.another = Client()
+        cls.another.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self):
+        return list(self.another.get(FOLLOW_URL).context['page_obj'])
+
+    def test_new_post_fanned_out_to_followers(self):
+        '''Новый пост попадает в ленты подписчиков при записи.'''
+        Follow.objects.create(user=self.reader, author=self.author_of_post)
+        post = Post.objects.create(author=self.author_of_post, text='Пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_backfills_and_unfollow_purges(self):
+        '''Подписка заполняет ленту, отписка — очищает.'''
+        post = Post.objects.create(author=self.author_of_post, text='Пост')
+        self.another.get(PROFILE_FOLLOW)
+        self.assertEqual(self.feed(), [post])
+        self.another.get(PROFILE_UNFOLLOW)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_timeline_is_capped(self):
+        '''Лента читателя ограничена TIMELINE_LENGTH записями.'''
+        Follow.objects.create(user=self.reader, author=self.author_of_post)
+        for i in range(5):
+            Post.objects.create(author=self.author_of_post, text=f'Пост {i}')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_pulled_at_read_time(self):
+        '''Посты популярного автора не раздаются, а читаются из Post.'''
+        Follow.objects.create(user=self.reader, author=self.author_of_post)
+        Follow.objects.create(user=self.reader_2, author=self.author_of_post)
+        cache.clear()
+        post = Post.objects.create(author=self.author_of_post, text='Пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    @mock.patch.object(signals.transaction, 'on_commit', lambda func: func())
+    def test_author_dropping_out_of_popular_fans_out(self):
+        '''Посты автора, выпавшего из популярных, остаются в лентах.'''
+        Follow.objects.create(user=self.reader, author=self.author_of_post)
+        Follow.objects.create(user=self.reader_2, author=self.author_of_post)
+        cache.clear()
+        post = Post.objects.create(author=self.author_of_post, text='Пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.get(user=self.reader_2).delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
@@ -1,5 +1,6 @@
 from http import client
 
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -48,6 +49,9 @@ class PostsURLTests(TestCase):
         cls.author = Client()
         cls.author.force_login(cls.author_of_post)
 
+    def setUp(self):
+        cache.clear()
+
     def test_urls_exists_at_desired_location(self):
         """Страницы приложения доступные пользователю."""
         cases = [
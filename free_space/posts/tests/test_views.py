@@ -130,14 +130,42 @@ class PostsViewTests(TestCase):
         self.assertEqual(group.id, self.group.id)
 
     def test_checking_cache(self):
-        '''Проверка кеша'''
+        '''Лента берётся из кеша, пока версии ленты не изменились'''
+        cache.clear()
         cache_before = self.guest.get(MAIN_URL).content
+        Post.objects.update(text='Правка в обход сигналов')
+        self.assertEqual(cache_before, self.guest.get(MAIN_URL).content)
         Post.objects.all().delete()
-        cache_after = self.guest.get(MAIN_URL).content
-        self.assertEqual(cache_before, cache_after)
+        self.assertNotEqual(cache_before, self.guest.get(MAIN_URL).content)
+
+    def test_feed_cache_keyed_by_page_and_shared_by_viewers(self):
+        '''Кеш ленты различает страницы и общий для всех читателей'''
         cache.clear()
-        cache_new = self.guest.get(MAIN_URL).content
-        self.assertNotEqual(cache_before, cache_new)
+        Post.objects.bulk_create(
+            Post(author=self.author_of_post, text=f'Пост №{i}')
+            for i in range(settings.NUMB_POSTS_PAGE)
+        )
+        page_2 = f'{MAIN_URL}?page=2'
+        self.assertNotContains(self.another.get(MAIN_URL), self.post.text)
+        self.assertContains(self.another.get(page_2), self.post.text)
+        Post.objects.filter(id=self.post.id).update(text='Правка без сигналов')
+        for visitor in (self.author, self.guest):
+            with self.subTest(visitor=visitor):
+                response = visitor.get(page_2)
+                self.assertContains(response, self.post.text)
+                self.assertNotContains(response, 'blog_likes_id')
+
+    def test_card_follows_group_and_author_names(self):
+        '''Карточка из кеша обновляется при переименовании группы и автора'''
+        cache.clear()
+        self.another.get(MAIN_URL)
+        Group.objects.filter(id=self.group.id).update(title='Новое имя')
+        User.objects.filter(id=self.author_of_post.id).update(
+            first_name='Новый', last_name='Автор'
+        )
+        response = self.another.get(MAIN_URL)
+        self.assertContains(response, '#Новое имя')
+        self.assertContains(response, '@Новый Автор')
 
     def test_adding_subscription(self):
         '''Добавление подписки'''
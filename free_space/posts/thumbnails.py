@@ -0,0 +1,147 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .caching import bump_versions, post_scopes
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+QUEUED_KEY = 'thumbnail:queued:{name}'
+QUEUED_TIMEOUT = 60 * 5
+
+_pool = None
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Поиск уже готовой миниатюры без чтения и генерации картинок."""
+
+    def ready_thumbnail(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        # Те же правила, что в ThumbnailBackend.get_thumbnail: иначе
+        # имя миниатюры не совпадёт с созданной воркером.
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return default.kvstore.get(ImageFile(
+            self._get_thumbnail_filename(source, geometry_string, options),
+            default.storage,
+        ))
+
+
+backend = ReadyThumbnailBackend()
+
+
+def ready(image, spec):
+    """Готовая миниатюра размера spec из THUMBNAIL_SPECS или None."""
+    geometry, options = settings.THUMBNAIL_SPECS[spec]
+    return backend.ready_thumbnail(image, geometry, **options)
+
+
+def complete(image):
+    """Готовы ли все миниатюры из THUMBNAIL_SPECS для картинки."""
+    return all(ready(image, spec) for spec in settings.THUMBNAIL_SPECS)
+
+
+def source(name):
+    """Исходник для sorl: ключ миниатюры зависит и от хранилища."""
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def generate(name):
+    """Создаёт все миниатюры из THUMBNAIL_SPECS для картинки name.
+
+    В пуле процессов сдвиг версий страниц и снятие QUEUED_KEY видны
+    веб-воркерам только через общий кеш (Redis, Memcached), см.
+    check_shared_cache.
+    """
+    for geometry, options in settings.THUMBNAIL_SPECS.values():
+        get_thumbnail(source(name), geometry, **options)
+    # Новый modified меняет ключ кеша карточек с этой картинкой.
+    posts = Post.objects.filter(image=name).select_related('author', 'group')
+    posts.update(modified=timezone.now())
+    for post in posts:
+        bump_versions(*post_scopes(post))
+    cache.delete(QUEUED_KEY.format(name=name))
+
+
+@checks.register()
+def check_shared_cache(app_configs, **kwargs):
+    if settings.THUMBNAIL_WORKERS and isinstance(
+        caches['shared'], LocMemCache
+    ):
+        return [checks.Warning(
+            'THUMBNAIL_WORKERS > 0 с LocMemCache в кеше shared.',
+            hint=(
+                'Процессы пула пишут версию контента и отметки очереди в '
+                'свой LocMem, веб-воркеры их не увидят: задайте '
+                'SHARED_CACHE_BACKEND (Redis, Memcached).'
+            ),
+            id='posts.W001',
+        )]
+    return []
+
+
+def pool():
+    global _pool
+    if _pool is None:
+        # spawn, а не fork: дочерний процесс не делит с веб-воркером
+        # соединения с базой, Django в нём поднимает django.setup.
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _pool
+
+
+def log_failure(future):
+    if future.exception() is not None:
+        logger.error(
+            'Не удалось создать миниатюры', exc_info=future.exception()
+        )
+
+
+def submit(name):
+    """Отдаёт картинку пулу; повторы в пределах QUEUED_TIMEOUT не ставит."""
+    if not cache.add(QUEUED_KEY.format(name=name), 1, QUEUED_TIMEOUT):
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        generate(name)
+        return
+    pool().submit(generate, name).add_done_callback(log_failure)
+
+
+def schedule(image):
+    """Ставит генерацию миниатюр после коммита сохранения поста."""
+    if image:
+        transaction.on_commit(lambda: submit(image.name))
+
+
+def request(image):
+    """Миниатюры не найдены при рендере: просим пул, сами не ждём.
+
+    Без пула (THUMBNAIL_WORKERS = 0) рендер ничего не запускает,
+    страница показывает оригинал, пока миниатюры картинок, загруженных
+    до генерации после сохранения, не создаст generate_thumbnails.
+    """
+    if image and settings.THUMBNAIL_WORKERS:
+        submit(image.name)
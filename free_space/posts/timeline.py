@@ -0,0 +1,151 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, Subquery
+
+from .models import Follow, Post, TimelineEntry
+
+POPULAR_KEY = 'timeline:popular:{author_id}'
+POPULAR_TTL = 60 * 60
+DEMOTE_BATCH_SIZE = 100
+
+
+def is_popular(author_id):
+    """Автор с подписчиками сверх лимита раздаётся при чтении, а не записи."""
+    key = POPULAR_KEY.format(author_id=author_id)
+    popular = cache.get(key)
+    if popular is None:
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        popular = Follow.objects.filter(
+            author_id=author_id
+        )[:limit + 1].count() > limit
+        cache.set(key, popular, POPULAR_TTL)
+    return popular
+
+
+def popular_authors(author_ids):
+    """Популярные из author_ids: флаги из кеша, промахи — одним запросом."""
+    keys = {
+        POPULAR_KEY.format(author_id=author_id): author_id
+        for author_id in author_ids
+    }
+    flags = cache.get_many(keys)
+    missing = [
+        author_id for key, author_id in keys.items() if key not in flags
+    ]
+    if missing:
+        counts = dict(Follow.objects.filter(
+            author_id__in=missing
+        ).order_by().values('author_id').annotate(
+            followers=Count('id')
+        ).values_list('author_id', 'followers'))
+        fresh = {
+            POPULAR_KEY.format(author_id=author_id):
+                counts.get(author_id, 0) > settings.TIMELINE_FANOUT_LIMIT
+            for author_id in missing
+        }
+        cache.set_many(fresh, POPULAR_TTL)
+        flags.update(fresh)
+    return [author_id for key, author_id in keys.items() if flags[key]]
+
+
+def trim(user_ids):
+    """Оставляет в лентах читателей не больше TIMELINE_LENGTH записей."""
+    length = settings.TIMELINE_LENGTH
+    TimelineEntry.objects.filter(
+        user_id__in=user_ids,
+        pub_date__lt=Subquery(
+            TimelineEntry.objects.filter(
+                user_id=OuterRef('user_id')
+            ).order_by('-pub_date').values('pub_date')[length - 1:length]
+        ),
+    ).delete()
+
+
+def fan_out(post):
+    if is_popular(post.author_id):
+        return
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ),
+        ignore_conflicts=True,
+    )
+    trim(followers)
+
+
+def backfill(user_id, author_id):
+    if is_popular(author_id):
+        return
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in Post.objects.filter(
+                author_id=author_id
+            ).values_list('id', 'pub_date')[:settings.TIMELINE_LENGTH]
+        ),
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def demote(author_id):
+    """Раздаёт посты автора, переставшего быть популярным.
+
+    Пока автор был популярным, его посты подмешивались при чтении и
+    в ленты не записывались. Переход ловится после отписки: флаг True
+    и подписчиков не больше лимита, либо флага нет и их ровно лимит.
+    Флаг False значит, что посты уже раздавались при записи.
+    """
+    key = POPULAR_KEY.format(author_id=author_id)
+    popular = cache.get(key)
+    if popular is False:
+        return
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    followers = list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)[:limit + 1])
+    if len(followers) > limit or (
+        popular is None and len(followers) < limit
+    ):
+        return
+    cache.set(key, False, POPULAR_TTL)
+    posts = list(Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')[:settings.TIMELINE_LENGTH])
+    for start in range(0, len(followers), DEMOTE_BATCH_SIZE):
+        user_ids = followers[start:start + DEMOTE_BATCH_SIZE]
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id, post_id=post_id, pub_date=pub_date
+                )
+                for user_id in user_ids
+                for post_id, pub_date in posts
+            ),
+            ignore_conflicts=True,
+        )
+        trim(user_ids)
+
+
+def purge(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def feed(user):
+    """Посты ленты подписок: материализованные записи плюс популярные
+    авторы, чьи посты подмешиваются при чтении."""
+    popular = popular_authors(Follow.objects.filter(
+        user=user
+    ).values_list('author_id', flat=True))
+    return Post.objects.filter(
+        Q(id__in=TimelineEntry.objects.filter(
+            user=user
+        ).values('post_id'))
+        | Q(author_id__in=popular)
+    )
@@ -1,7 +1,7 @@
 from django.urls import path
 
 from . import views
-from .views import AddLikeView, RemoveLikeView
+from .views import AddLikeView, RemoveLikeView, ToggleLikeView
 
 app_name = 'posts'
 
@@ -10,16 +10,21 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.post_search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.comment_list,
+         name='comment_list'),
     path('follow/', views.follow_index, name='follow_index'),
     path('profile/<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('profile/<str:username>/unfollow/', views.profile_unfollow,
          name='profile_unfollow'),
+    path('likes/', views.like_states, name='like_states'),
     path('add/', AddLikeView.as_view(), name='add'),
     path('remove/', RemoveLikeView.as_view(), name='remove'),
+    path('like/', ToggleLikeView.as_view(), name='like_toggle'),
 
 ]
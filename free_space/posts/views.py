@@ -1,33 +1,62 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.http import is_safe_url
+from django.views.decorators.cache import never_cache
 from django.views.generic import View
 
+from . import search, stats, thumbnails, timeline
+from .caching import conditional_page
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Like, Post, User
+from .likes import PageLikes, toggled_state
+from .models import Comment, Follow, Group, Like, Post, User
+from .paginators import CursorPaginator, EstimatedCountPaginator
 
 
 def page_of_paginator(request, queryset):
-    return Paginator(queryset, settings.NUMB_POSTS_PAGE).get_page(
-        request.GET.get('page')
+    # Старые ссылки вида ?page=N продолжают работать через OFFSET.
+    if request.GET.get('page'):
+        return EstimatedCountPaginator(
+            queryset, settings.NUMB_POSTS_PAGE
+        ).get_page(request.GET.get('page'))
+    return CursorPaginator(queryset, settings.NUMB_POSTS_PAGE).cursor_page(
+        request.GET.get('cursor')
     )
 
 
+def feed_context(request, queryset):
+    page_obj = page_of_paginator(request, queryset)
+    return {
+        'page_obj': page_obj,
+        'page_likes': PageLikes(page_obj, request.user),
+        'feed_cache_ttl': settings.FEED_CACHE_TTL,
+    }
+
+
+@conditional_page(lambda request: ['index'])
 def index(request):
-    return render(request, 'posts/index.html', {
-        'page_obj': page_of_paginator(request, Post.objects.all())
-    })
+    return render(
+        request,
+        'posts/index.html',
+        feed_context(request, Post.objects.for_feed()),
+    )
 
 
+@conditional_page(lambda request, slug: [f'group:{slug}'])
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     return render(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': page_of_paginator(request, group.posts.all())
+        **feed_context(request, group.posts.for_feed()),
     })
 
 
+@conditional_page(lambda request, username: [f'author:{username}'])
 def profile(request, username):
     author = get_object_or_404(User, username=username)
     following = Follow.objects.filter(
@@ -36,15 +65,63 @@ def profile(request, username):
     ).exists()
     return render(request, 'posts/profile.html', {
         'author': author,
-        'page_obj': page_of_paginator(request, author.posts.all()),
+        'stats': stats.for_author(author),
         'following': following,
+        **feed_context(request, author.posts.for_feed()),
     })
 
 
+def post_detail_scopes(request, post_id):
+    # Страница поста показывает и число постов автора.
+    author = Post.objects.filter(id=post_id).values_list(
+        'author__username', flat=True
+    ).first()
+    return [f'post:{post_id}', f'author:{author}']
+
+
+def comments_page(post_id, cursor):
+    """Страница комментариев поста, новые сверху, авторы — тем же JOIN."""
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.NUMB_COMMENTS_PAGE,
+        keys=('created', 'id'),
+    ).cursor_page(cursor)
+
+
+@conditional_page(post_detail_scopes)
 def post_detail(request, post_id):
+    post = get_object_or_404(Post, id=post_id)
     return render(request, 'posts/post_detail.html', {
-        'post': get_object_or_404(Post, id=post_id),
+        'post': post,
+        'author_stats': stats.for_author(post.author),
+        'page_likes': PageLikes([post], request.user),
         'form': CommentForm(request.POST or None),
+        'comments': comments_page(post.id, request.GET.get('comments')),
+    })
+
+
+@conditional_page(lambda request, post_id: [f'post:{post_id}'])
+def comment_list(request, post_id):
+    """Следующая страница комментариев фрагментом для «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    return render(request, 'posts/includes/comments.html', {
+        'post': post,
+        'comments': comments_page(post.id, request.GET.get('cursor')),
+    })
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = CursorPaginator(
+        search.search(query).for_feed(),
+        settings.NUMB_POSTS_PAGE,
+        keys=('rank', 'id'),
+    ).cursor_page(request.GET.get('cursor'))
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
+        'page_likes': PageLikes(page_obj, request.user),
+        'feed_cache_ttl': settings.FEED_CACHE_TTL,
     })
 
 
@@ -54,7 +131,8 @@ def post_create(request):
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
     form.instance.author = request.user
-    form.save()
+    post = form.save()
+    thumbnails.schedule(post.image)
     return redirect('posts:profile', request.user.username)
 
 
@@ -70,30 +148,45 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    """Без JS — редирект на пост, для fetch — JSON с HTML комментария."""
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
-    return redirect('posts:post_detail', post_id=post_id)
+    if not request.is_ajax():
+        return redirect('posts:post_detail', post_id=post_id)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    return JsonResponse({
+        'id': comment.id,
+        'html': render_to_string(
+            'posts/includes/comment.html', {'comment': comment}, request
+        ),
+    }, status=201)
 
 
 @login_required
+@conditional_page(
+    lambda request: ['index', f'author:{request.user.username}']
+)
 def follow_index(request):
-    return render(request, 'posts/follow.html', {
-        'page_obj': page_of_paginator(
-            request,
-            Post.objects.filter(author__following__user=request.user)
-        ),
-    })
+    return render(
+        request,
+        'posts/follow.html',
+        feed_context(request, timeline.feed(request.user).for_feed()),
+    )
 
 
 @login_required
@@ -116,36 +209,91 @@ def profile_unfollow(request, username):
     return redirect('posts:follow_index')
 
 
-class AddLikeView(View):
-    def post(self, request, *args, **kwargs):
-        blog_post_id = int(request.POST.get('blog_post_id'))
-        user_id = int(request.POST.get('user_id'))
-        url_from = request.POST.get('url_from')
+@never_cache
+def like_states(request):
+    """Личная часть кнопок лайков для постов из ?ids=1,2,3."""
+    ids = [
+        int(post_id) for post_id
+        in request.GET.get('ids', '').split(',')[:settings.NUMB_LIKE_STATES]
+        if post_id.isdigit()
+    ]
+    page_likes = PageLikes(
+        Post.objects.filter(id__in=ids).only('id', 'like_count'),
+        request.user,
+    )
+    return JsonResponse({
+        'posts': {
+            post_id: page_likes.state(post_id)
+            for post_id in page_likes.post_ids
+        },
+    })
 
-        user_inst = User.objects.get(id=user_id)
-        blog_post_inst = Post.objects.get(id=blog_post_id)
 
-        try:
-            blog_like_inst = Like.objects.get(
-                blog_post=blog_post_inst,
-                liked_by=user_inst
-            )
-        except Exception as error:
-            blog_like = Like(
-                blog_post=blog_post_inst,
-                liked_by=user_inst,
-                like=True
-            )
-            blog_like.save()
-        return redirect(url_from)
+def redirect_back(request):
+    """На url_from формы лайка, если он ведёт на этот же сайт."""
+    url = request.POST.get('url_from')
+    if not is_safe_url(
+        url,
+        allowed_hosts={request.get_host()},
+        require_https=request.is_secure(),
+    ):
+        url = reverse('posts:index')
+    return redirect(url)
 
 
-class RemoveLikeView(View):
+class AddLikeView(LoginRequiredMixin, View):
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
-        blog_likes_id = int(request.POST.get('blog_likes_id'))
-        url_from = request.POST.get('url_from')
+        blog_post = get_object_or_404(
+            Post, id=request.POST.get('blog_post_id')
+        )
+        Like.objects.get_or_create(
+            blog_post=blog_post,
+            liked_by=request.user,
+            defaults={'like': True},
+        )
+        return redirect_back(request)
 
-        blog_like = Like.objects.get(id=blog_likes_id)
-        blog_like.delete()
 
-        return redirect(url_from)
\ No newline at end of file
+class RemoveLikeView(LoginRequiredMixin, View):
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        get_object_or_404(
+            Like,
+            id=request.POST.get('blog_likes_id'),
+            liked_by=request.user,
+        ).delete()
+        return redirect_back(request)
+
+
+class ToggleLikeView(LoginRequiredMixin, View):
+    """Ставит или снимает лайк читателя, отвечает JSON его состояния.
+
+    liked=1/0 задаёт нужное состояние (повтор ничего не меняет), без
+    него лайк переключается. Двойной клик не создаёт второй строки:
+    get_or_create упрётся в ограничение like_once и вернёт первую.
+    """
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        post = get_object_or_404(
+            Post.objects.only('id', 'like_count'),
+            id=request.POST.get('blog_post_id'),
+        )
+        wanted = request.POST.get('liked')
+        like, delta = None, 0
+        if wanted == '0':
+            delta = -Like.objects.filter(
+                blog_post=post, liked_by=request.user
+            ).delete()[0]
+        else:
+            like, created = Like.objects.get_or_create(
+                blog_post=post, liked_by=request.user,
+                defaults={'like': True},
+            )
+            if created:
+                delta = 1
+            elif wanted is None:
+                like.delete()
+                like, delta = None, -1
+        return JsonResponse(toggled_state(post, like, delta))
@@ -0,0 +1,59 @@
+// Комментарии без перезагрузки страницы поста. «Показать ещё» дописывает
+// следующую страницу фрагментом, форма отправляется через fetch и
+// вставляет новый комментарий сверху. Без JS ссылка открывает следующую
+// страницу на странице поста, а форма работает через редирект.
+(function () {
+  document.addEventListener('click', function (event) {
+    var link = event.target.closest('a.comments-more');
+    if (!link) {
+      return;
+    }
+    event.preventDefault();
+    fetch(link.dataset.fragmentUrl, {
+      credentials: 'same-origin'
+    }).then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.statusText);
+      }
+      return response.text();
+    }).then(function (html) {
+      link.insertAdjacentHTML('afterend', html);
+      link.remove();
+    }).catch(function () {
+      window.location = link.href;
+    });
+  });
+
+  document.addEventListener('submit', function (event) {
+    var form = event.target.closest('form.comment-form');
+    if (!form) {
+      return;
+    }
+    event.preventDefault();
+    var errors = form.querySelector('.comment-errors');
+    fetch(form.action, {
+      method: 'POST',
+      body: new FormData(form),
+      credentials: 'same-origin',
+      headers: {'X-Requested-With': 'XMLHttpRequest'}
+    }).then(function (response) {
+      var type = response.headers.get('Content-Type') || '';
+      if (type.indexOf('application/json') === -1) {
+        throw new Error(response.statusText);
+      }
+      return response.json();
+    }).then(function (data) {
+      if (data.errors) {
+        errors.textContent = Object.values(data.errors).join(' ');
+        errors.classList.add('d-block');
+        return;
+      }
+      errors.classList.remove('d-block');
+      document.querySelector('.comments')
+        .insertAdjacentHTML('afterbegin', data.html);
+      form.reset();
+    }).catch(function () {
+      form.submit();
+    });
+  });
+})();
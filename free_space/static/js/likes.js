@@ -0,0 +1,80 @@
+// Подставляет в кнопки лайков личное состояние читателя: отметку и id
+// лайка. Клик по кнопке меняет лайк через posts:like_toggle без
+// перерисовки страницы; если ответ не JSON (истёк вход, ошибка), форма
+// уходит обычным запросом на posts:add/posts:remove. Гостям скрипт
+// не подключается (см. base.html).
+(function () {
+  var script = document.currentScript;
+
+  function applyState(form, state) {
+    var likeId = form.elements.blog_likes_id;
+    form.querySelector('.likes-qty').textContent = state.count;
+    form.dataset.liked = state.liked ? '1' : '0';
+    if (state.liked) {
+      if (!likeId) {
+        likeId = document.createElement('input');
+        likeId.type = 'hidden';
+        likeId.name = 'blog_likes_id';
+        form.appendChild(likeId);
+      }
+      likeId.value = state.like_id;
+      form.action = form.dataset.removeUrl;
+      form.querySelector('i').className = 'fa fa-heart-heart-solid';
+      form.querySelector('i').textContent = '♥';
+    } else {
+      if (likeId) {
+        likeId.remove();
+      }
+      form.action = form.dataset.addUrl;
+      form.querySelector('i').className = 'fa fa-heart-heart';
+      form.querySelector('i').textContent = '♡';
+    }
+  }
+
+  function toggle(event) {
+    var form = event.target;
+    event.preventDefault();
+    var data = new FormData(form);
+    data.set('liked', form.dataset.liked === '1' ? '0' : '1');
+    fetch(form.dataset.toggleUrl, {
+      method: 'POST',
+      body: data,
+      credentials: 'same-origin',
+      headers: {'X-Requested-With': 'XMLHttpRequest'}
+    }).then(function (response) {
+      var type = response.headers.get('Content-Type') || '';
+      if (!response.ok || type.indexOf('application/json') === -1) {
+        throw new Error(response.statusText);
+      }
+      return response.json();
+    }).then(function (state) {
+      applyState(form, state);
+    }).catch(function () {
+      form.submit();
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    var forms = document.querySelectorAll('form.like-form');
+    if (!forms.length) {
+      return;
+    }
+    var ids = Array.prototype.map.call(forms, function (form) {
+      form.dataset.addUrl = form.action;
+      form.addEventListener('submit', toggle);
+      return form.dataset.postId;
+    });
+    fetch(script.dataset.stateUrl + '?ids=' + ids.join(','), {
+      credentials: 'same-origin'
+    }).then(function (response) {
+      return response.json();
+    }).then(function (data) {
+      Array.prototype.forEach.call(forms, function (form) {
+        var state = data.posts[form.dataset.postId];
+        if (state) {
+          applyState(form, state);
+        }
+      });
+    });
+  });
+})();